@@ -10,11 +10,11 @@ import logging
 from datetime import datetime, timedelta
 from flask import Flask, request, redirect, url_for, flash, session, jsonify
 from werkzeug.middleware.proxy_fix import ProxyFix
-from extensions import limiter, csrf
+from extensions import limiter, csrf, server_session
 import stripe  # type: ignore[reportMissingImports]
 
 from config import Config
-from database import get_db_connection, get_param_placeholder, init_database
+from database import get_db_connection, get_param_placeholder, init_database, release_request_connection
 from health import health_check
 
 # ---------------------------------------------------------------------------
@@ -81,6 +81,7 @@ logger.info("All required environment variables are set")
 Config.check_secret_key()
 Config.check_verify_token()
 Config.check_production_database()
+Config.check_rate_limit_storage()
 
 # ---------------------------------------------------------------------------
 # Create Flask app
@@ -93,12 +94,26 @@ app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=Config.SESSION_TIMEOU
 app.config['SESSION_COOKIE_SECURE'] = Config.SESSION_COOKIE_SECURE
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+if Config.SESSION_STORAGE == 'redis':
+    from jobs.queue import get_redis_connection
+    # Server-side sessions on the shared Redis client: one GET per request, and the
+    # cookie shrinks to the session id. Non-permanent by default, as with Flask's
+    # cookie sessions (login sets session.permanent).
+    app.config['SESSION_TYPE'] = 'redis'
+    app.config['SESSION_REDIS'] = get_redis_connection()
+    app.config['SESSION_KEY_PREFIX'] = 'chata:session:'
+    app.config['SESSION_PERMANENT'] = False
 
 # ---------------------------------------------------------------------------
 # Extensions (defined in extensions.py to avoid circular imports)
 # ---------------------------------------------------------------------------
 limiter.init_app(app)
 csrf.init_app(app)
+if Config.SESSION_STORAGE == 'redis':
+    server_session.init_app(app)
+
+# Hand the request's pooled PostgreSQL connection back once the request is done
+app.teardown_request(release_request_connection)
 
 # ---------------------------------------------------------------------------
 # Stripe
@@ -161,7 +176,7 @@ def health():
 
 @app.route("/health/detailed")
 def health_detailed():
-    return jsonify(health_check())
+    return jsonify(health_check(detailed=True))
 
 
 @app.route("/ping")
@@ -22,6 +22,13 @@ class Config:
     # PostgreSQL connection pool size (per process). Increase under heavy webhook load. Clamped 1–50.
     _pool_size = int(os.getenv("DATABASE_POOL_SIZE", "10"))
     DATABASE_POOL_SIZE = max(1, min(50, _pool_size))
+    # Idle connections the pool keeps open; returned connections beyond this are closed, so size it to
+    # the worker's thread count (WEB_THREADS) to avoid reconnecting on every request. Clamped 1–POOL_SIZE.
+    _pool_min = int(os.getenv("DATABASE_POOL_MIN", "4"))
+    DATABASE_POOL_MIN = max(1, min(DATABASE_POOL_SIZE, _pool_min))
+    # Pooled PostgreSQL connections older than this are closed when returned, so sockets are recycled
+    # before server/proxy idle timeouts silently drop them. 0 disables recycling.
+    DATABASE_POOL_RECYCLE_SECONDS = int(os.getenv("DATABASE_POOL_RECYCLE_SECONDS", "1800"))
     # Run update_schema migration on app startup. Set to "false" to speed startup and run migrations via release command.
     RUN_MIGRATIONS_ON_STARTUP = os.getenv("RUN_MIGRATIONS_ON_STARTUP", "true").lower() not in ("false", "0", "no")
     
@@ -32,10 +39,29 @@ class Config:
     OPENAI_GLOBAL_DAILY_BUDGET_USD = float(os.getenv("OPENAI_GLOBAL_DAILY_BUDGET_USD", "100"))
     OPENAI_ENABLE_MODERATION = os.getenv("OPENAI_ENABLE_MODERATION", "false").lower() in ("true", "1", "yes")
 
+    # Global bot settings (settings table keys). Served from memory; the settings table is only
+    # consulted when SETTINGS_DB_OVERRIDES is enabled (values edited there take precedence).
+    SETTINGS_DEFAULTS = {
+        "bot_personality": os.getenv("BOT_PERSONALITY", "You are a helpful and friendly Instagram bot."),
+        "temperature": os.getenv("BOT_TEMPERATURE", "0.7"),
+        "max_tokens": os.getenv("BOT_MAX_TOKENS", "150"),
+    }
+    SETTINGS_DB_OVERRIDES = os.getenv("SETTINGS_DB_OVERRIDES", "false").lower() in ("true", "1", "yes")
+
     # Redis / RQ (background job queue)
     REDIS_URL = os.getenv("REDIS_URL")
     RQ_QUEUE_NAME = os.getenv("RQ_QUEUE_NAME", "chata-webhooks")
+    # Webhook jobs are spread over this many queues by sender (RQ_QUEUE_NAME:0 ... :N-1),
+    # so workers can be split across shards. 1 keeps the single RQ_QUEUE_NAME queue;
+    # `python -m jobs.worker` (the Procfile worker) listens on every shard by default.
+    RQ_QUEUE_SHARDS = max(1, int(os.getenv("RQ_QUEUE_SHARDS", "1")))
+    # Identical webhook batches (Meta redelivers on timeouts/5xx) are enqueued once within this window.
+    WEBHOOK_DEDUPE_TTL_SECONDS = int(os.getenv("WEBHOOK_DEDUPE_TTL_SECONDS", "3600"))
     RQ_DEFAULT_TIMEOUT_SECONDS = int(os.getenv("RQ_DEFAULT_TIMEOUT_SECONDS", "180"))
+    # Upper bound on the per-process Redis connection pool shared by every enqueue.
+    REDIS_MAX_CONNECTIONS = max(1, int(os.getenv("REDIS_MAX_CONNECTIONS", "50")))
+    # Connect/read timeout for that client, so a hung Redis fails enqueues and /health fast.
+    REDIS_SOCKET_TIMEOUT_SECONDS = float(os.getenv("REDIS_SOCKET_TIMEOUT_SECONDS", "5"))
 
     # Token encryption (Fernet keyring for Instagram tokens at rest)
     TOKEN_ENCRYPTION_KEYS = os.getenv("TOKEN_ENCRYPTION_KEYS")
@@ -48,6 +74,9 @@ class Config:
     # Session hardening
     SESSION_TIMEOUT_HOURS = int(os.getenv("SESSION_TIMEOUT_HOURS", "24"))
     SESSION_COOKIE_SECURE = os.getenv("SESSION_COOKIE_SECURE", "true").lower() in ("true", "1", "yes")
+    # Session storage: "redis" keeps session data server-side (the cookie only carries a random id);
+    # "cookie" is Flask's signed-cookie session. Defaults to redis whenever REDIS_URL is set.
+    SESSION_STORAGE = os.getenv("SESSION_STORAGE", "redis" if REDIS_URL else "cookie").lower()
     
     # Meta/Instagram Configuration
     _DEFAULT_VERIFY_TOKEN = "chata_verify_token"
@@ -96,17 +125,17 @@ class Config:
     ADDON_REPLIES = 150          # replies per add-on purchase
     REPLY_WARNING_THRESHOLD = 50  # warn user when remaining replies fall to this
     
-    # Rate limiting: RATE_LIMIT_STORAGE_URI (default memory://). Set to redis://... in production for shared limits across workers.
-    RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+    # Rate limiting: RATE_LIMIT_STORAGE_URI, else REDIS_URL, else memory:// (per-worker; local dev only).
+    RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI") or os.getenv("REDIS_URL") or "memory://"
+    # flask-limiter strategy: sliding-window-counter smooths bursts at window edges for two Redis keys per hit.
+    RATE_LIMIT_STRATEGY = os.getenv("RATE_LIMIT_STRATEGY", "sliding-window-counter")
     # Production Settings
     PORT = int(os.environ.get("PORT", 5000))
     
     @classmethod
     def is_production(cls):
         """True when DATABASE_URL points to PostgreSQL (i.e. not local SQLite dev)."""
-        return bool(cls.DATABASE_URL and (
-            cls.DATABASE_URL.startswith("postgres://") or cls.DATABASE_URL.startswith("postgresql://")
-        ))
+        return bool(cls.DATABASE_URL and cls.DATABASE_URL.startswith(("postgres://", "postgresql://")))
 
     @classmethod
     def validate_required_vars(cls):
@@ -135,9 +164,7 @@ class Config:
     @classmethod
     def check_secret_key(cls):
         """Raise an error if the default SECRET_KEY is used in production (DATABASE_URL is set)."""
-        is_production = cls.DATABASE_URL and (
-            cls.DATABASE_URL.startswith("postgres://") or cls.DATABASE_URL.startswith("postgresql://")
-        )
+        is_production = cls.is_production()
         if is_production and cls.SECRET_KEY == cls._DEFAULT_SECRET:
             raise RuntimeError(
                 "FATAL: SECRET_KEY is still the default placeholder. "
@@ -148,22 +175,27 @@ class Config:
     def check_verify_token(cls):
         """Warn if VERIFY_TOKEN is unset or still the default in production (consider using a random value for Meta webhook)."""
         import logging
-        is_production = cls.DATABASE_URL and (
-            cls.DATABASE_URL.startswith("postgres://") or cls.DATABASE_URL.startswith("postgresql://")
-        )
+        is_production = cls.is_production()
         if is_production and (not cls.VERIFY_TOKEN or cls.VERIFY_TOKEN == cls._DEFAULT_VERIFY_TOKEN):
             logging.getLogger("chata").warning(
                 "VERIFY_TOKEN is unset or default in production. Consider setting a random VERIFY_TOKEN for Meta webhook security."
             )
 
+    @classmethod
+    def check_rate_limit_storage(cls):
+        """Raise an error if rate limits would be kept in per-worker memory in production."""
+        if cls.is_production() and cls.RATE_LIMIT_STORAGE_URI.startswith("memory://"):
+            raise RuntimeError(
+                "FATAL: rate limit storage is memory:// in production, so every worker keeps its own counters. "
+                "Set RATE_LIMIT_STORAGE_URI or REDIS_URL to a Redis URL."
+            )
+
     @classmethod
     def check_production_database(cls):
         """When ENV=production, require DATABASE_URL to be set and PostgreSQL (no SQLite in production)."""
         if os.getenv("ENV", "").lower() != "production":
             return
-        if not cls.DATABASE_URL or not (
-            cls.DATABASE_URL.startswith("postgres://") or cls.DATABASE_URL.startswith("postgresql://")
-        ):
+        if not cls.is_production():
             raise RuntimeError(
                 "FATAL: ENV=production requires DATABASE_URL to be a PostgreSQL URL. "
                 "SQLite is not supported in production."
@@ -6,18 +6,38 @@ import os
 import logging
 import sqlite3
 import threading
+import time
+import urllib.parse
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: no cross-process init lock for SQLite
+    fcntl = None
 import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
 import psycopg2.pool
+from flask import g, has_request_context
 from config import Config
 
 logger = logging.getLogger("chata.database")
 
+# The database backend cannot change while the process runs: resolve it once
+# here instead of re-reading the environment on every connection/query.
+_DATABASE_URL = os.environ.get('DATABASE_URL') or getattr(Config, 'DATABASE_URL', None) or ''
+_IS_POSTGRES = _DATABASE_URL.startswith(('postgres://', 'postgresql://'))
+
 # ---------------------------------------------------------------------------
-# PostgreSQL connection pool (initialised lazily on first use)
+# PostgreSQL connection pool (opened by init_pool() at startup, else on first use)
 # ---------------------------------------------------------------------------
 _pg_pool = None
 _pg_pool_lock = threading.Lock()
+# Separate, tiny pool for /health probes, so a saturated main pool does not
+# false-fail liveness checks (and probes never take app connections).
+_health_pool = None
+_health_pool_lock = threading.Lock()
 _CONNECT_TIMEOUT_SECONDS = int(os.environ.get("DATABASE_CONNECT_TIMEOUT", "10"))
+# Rows fetched per network round-trip by server-side cursors (see server_cursor()).
+_SERVER_CURSOR_ITERSIZE = 1000
 
 
 def _pg_dsn_with_timeout(database_url):
@@ -28,670 +48,902 @@ def _pg_dsn_with_timeout(database_url):
     return f"{database_url}{sep}connect_timeout={_CONNECT_TIMEOUT_SECONDS}"
 
 
+# Pooled connections idle for longer than this get a SELECT 1 before being handed
+# out, so a socket the server or a proxy dropped meanwhile is replaced instead of
+# failing the caller's first query. Connections reused sooner skip the round-trip.
+_POOL_PING_AFTER_IDLE_SECONDS = 30
+
+
+class _RecyclingConnectionPool(psycopg2.pool.ThreadedConnectionPool):
+    """ThreadedConnectionPool that closes connections older than max_age when
+    they are returned, instead of handing out the same socket forever, and
+    checks a connection is still alive before handing it out."""
+
+    def __init__(self, minconn, maxconn, *args, max_age=0, **kwargs):
+        self._max_age = max_age
+        self._opened_at = {}
+        self._returned_at = {}
+        # Counters for pool_stats(); guarded separately so the pool's own lock is never held longer.
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'acquire_total': 0,
+            'acquire_failed_total': 0,
+            'acquire_seconds_total': 0.0,
+            'acquire_seconds_max': 0.0,
+            'discarded_dead_total': 0,
+        }
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def getconn(self, key=None):
+        started = time.perf_counter()
+        try:
+            conn = self._getconn_alive(key)
+        except psycopg2.Error:  # includes PoolError ("connection pool exhausted")
+            with self._stats_lock:
+                self._stats['acquire_failed_total'] += 1
+            raise
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            self._stats['acquire_total'] += 1
+            self._stats['acquire_seconds_total'] += elapsed
+            if elapsed > self._stats['acquire_seconds_max']:
+                self._stats['acquire_seconds_max'] = elapsed
+        return conn
+
+    def _getconn_alive(self, key):
+        # After a server restart every idle connection is dead, so keep evicting until a
+        # live or freshly opened one comes out (bounded by maxconn).
+        for _ in range(self.maxconn):
+            conn = super().getconn(key)
+            if self._is_alive(conn):
+                return conn
+            logger.warning("Discarding dead pooled PostgreSQL connection")
+            with self._stats_lock:
+                self._stats['discarded_dead_total'] += 1
+            self.putconn(conn, key=key, close=True)
+        return super().getconn(key)
+
+    def stats(self):
+        """Snapshot of the acquire counters plus current occupancy."""
+        with self._stats_lock:
+            snapshot = dict(self._stats)
+        snapshot.update(in_use=len(self._used), idle=len(self._pool), max_size=self.maxconn)
+        return snapshot
+
+    def _is_alive(self, conn):
+        """Cheap local checks first; a SELECT 1 only for long-idle connections."""
+        if conn.closed or conn.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        last_used = self._returned_at.pop(id(conn), None) or self._opened_at.get(id(conn))
+        if last_used is None or time.monotonic() - last_used < _POOL_PING_AFTER_IDLE_SECONDS:
+            return True
+        try:
+            # autocommit for the probe so it is one round-trip and leaves no transaction open
+            conn.autocommit = True
+            try:
+                conn.cursor().execute("SELECT 1")
+            finally:
+                conn.autocommit = False
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _connect(self, key=None):
+        conn = super()._connect(key)
+        self._opened_at[id(conn)] = time.monotonic()
+        return conn
+
+    def putconn(self, conn=None, key=None, close=False):
+        opened_at = self._opened_at.get(id(conn))
+        if not close and self._max_age and opened_at is not None:
+            close = time.monotonic() - opened_at > self._max_age
+        super().putconn(conn, key=key, close=close)
+        # The base class also closes connections returned while minconn are already idle.
+        if conn.closed:
+            self._opened_at.pop(id(conn), None)
+            self._returned_at.pop(id(conn), None)
+        else:
+            self._returned_at[id(conn)] = time.monotonic()
+
+
 def _get_pg_pool():
     """Return (and lazily create) the PostgreSQL connection pool."""
     global _pg_pool
     if _pg_pool is None:
         with _pg_pool_lock:
             if _pg_pool is None:
-                database_url = os.environ.get('DATABASE_URL')
-                if database_url:
+                if _IS_POSTGRES:
                     size = getattr(Config, 'DATABASE_POOL_SIZE', 10)
-                    dsn = _pg_dsn_with_timeout(database_url)
-                    _pg_pool = psycopg2.pool.ThreadedConnectionPool(
-                        minconn=1,
+                    dsn = _pg_dsn_with_timeout(_DATABASE_URL)
+                    _pg_pool = _RecyclingConnectionPool(
+                        minconn=getattr(Config, 'DATABASE_POOL_MIN', 1),
                         maxconn=size,
                         dsn=dsn,
+                        client_encoding='UTF8',
+                        max_age=getattr(Config, 'DATABASE_POOL_RECYCLE_SECONDS', 0),
                     )
     return _pg_pool
 
 
+def _get_health_pool():
+    """Return (and lazily create) the 1-2 connection pool reserved for health probes."""
+    global _health_pool
+    if _health_pool is None:
+        with _health_pool_lock:
+            if _health_pool is None:
+                _health_pool = _RecyclingConnectionPool(
+                    minconn=1,
+                    maxconn=2,
+                    dsn=_pg_dsn_with_timeout(_DATABASE_URL),
+                    client_encoding='UTF8',
+                    max_age=getattr(Config, 'DATABASE_POOL_RECYCLE_SECONDS', 0),
+                )
+    return _health_pool
+
+
+def pool_stats():
+    """Connection pool counters for monitoring (None on SQLite or before the pool exists).
+
+    in_use close to max_size, or a growing acquire_failed_total (pool exhausted),
+    means DATABASE_POOL_SIZE is too small for the worker's thread count.
+    """
+    if _pg_pool is None:
+        return None
+    return _pg_pool.stats()
+
+
+def init_pool():
+    """Open the PostgreSQL pool (and its DATABASE_POOL_MIN connections) now.
+
+    Called from init_database() so connection setup is paid at boot and a bad
+    DSN fails the deploy instead of the first request. No-op on SQLite.
+    """
+    if not _IS_POSTGRES:
+        return None
+    try:
+        return _get_pg_pool()
+    except psycopg2.Error as e:
+        logger.error("Could not open PostgreSQL connection pool: %s", e)
+        return None
+
+
 class _PooledConnection:
     """Thin wrapper so conn.close() returns the connection to the pool
     instead of actually closing it.  Delegates everything else to the
     real psycopg2 connection."""
 
-    def __init__(self, real_conn, pool):
+    __slots__ = ('_conn', '_pool', '_request_scoped', '_released')
+
+    def __init__(self, real_conn, pool, request_scoped=False):
         self._conn = real_conn
         self._pool = pool
+        self._request_scoped = request_scoped
+        self._released = False
 
     def close(self):
-        """Return connection to pool instead of closing it."""
+        """Return connection to pool instead of closing it.
+
+        A request-scoped connection stays checked out for the rest of the
+        request: close() only ends its transaction and marks it free for the
+        next get_db_connection() call; release_request_connection() hands it
+        back to the pool at teardown.
+        """
+        if self._released:
+            return
+        self._released = True
+        if self._request_scoped:
+            if not self._is_current_request_connection():
+                return  # already handed back at teardown
+            try:
+                self._conn.rollback()
+            except psycopg2.Error:
+                release_request_connection()
+                return
+            g._db_conn_in_use = False
+            return
         try:
-            self._pool.putconn(self._conn)
-        except Exception:
+            # A connection that broke while checked out must not be handed out again.
+            self._pool.putconn(self._conn, close=self._conn.closed != 0)
+        except (psycopg2.pool.PoolError, psycopg2.InterfaceError):
+            # Pool already closed or connection not from it: just close the socket.
             self._conn.close()
 
+    def discard(self):
+        """Close the underlying connection and drop it from the pool (use after
+        an error that may have left the socket broken)."""
+        if self._released:
+            return
+        self._released = True
+        if self._request_scoped:
+            if self._is_current_request_connection():
+                self._conn.close()
+                release_request_connection()
+            return
+        self._pool.putconn(self._conn, close=True)
+
+    def _is_current_request_connection(self):
+        return has_request_context() and g.get('_db_conn') is self._conn
+
+    # The hot methods are delegated explicitly; __getattr__ covers the rest.
+    def cursor(self, *args, **kwargs):
+        return self._conn.cursor(*args, **kwargs)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def __enter__(self):
+        # Same semantics as psycopg2: the block is one transaction, committed on
+        # success and rolled back on error; the connection is not released.
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._conn.__exit__(exc_type, exc_value, traceback)
+
     def __getattr__(self, name):
         return getattr(self._conn, name)
 
 
-def get_db_connection():
-    """Get database connection — uses pool for PostgreSQL, direct for SQLite."""
-    database_url = os.environ.get('DATABASE_URL')
+# One pooled connection per request, kept on flask.g: the first get_db_connection()
+# in a request checks it out of the pool, later calls in the same request reuse it
+# without touching the pool lock, and the teardown_request hook returns it.
+def _get_request_connection(pool):
+    """Return a request-scoped wrapper, or a plain pooled one if the request's
+    connection is currently handed out (nested get_db_connection() calls)."""
+    conn = g.get('_db_conn')
+    if conn is not None and conn.closed:
+        release_request_connection()
+        conn = None
+    if conn is None:
+        g._db_conn = conn = pool.getconn()
+        g._db_pool = pool
+        g._db_conn_in_use = True
+        return _PooledConnection(conn, pool, request_scoped=True)
+    if not g._db_conn_in_use:
+        g._db_conn_in_use = True
+        return _PooledConnection(conn, pool, request_scoped=True)
+    return _PooledConnection(pool.getconn(), pool)
+
+
+def release_request_connection(exception=None):
+    """Return the request-scoped connection to the pool.
+
+    Registered as a Flask teardown_request handler; safe to call when the
+    request never touched the database.
+    """
+    conn = g.pop('_db_conn', None)
+    if conn is None:
+        return
+    pool = g.pop('_db_pool')
+    g._db_conn_in_use = False
+    try:
+        pool.putconn(conn, close=bool(conn.closed))
+    except Exception:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# SQLite (local development / light single-host deployments)
+# ---------------------------------------------------------------------------
+# WAL lets readers proceed while a write is in flight, and synchronous=NORMAL is
+# still crash-safe under WAL while fsyncing once per checkpoint instead of twice
+# per commit. busy_timeout makes concurrent writers wait instead of failing with
+# "database is locked". mmap_size lets reads hit the OS page cache directly
+# instead of copying pages through SQLite's own cache.
+_SQLITE_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=30000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA mmap_size=268435456",
+)
+
+# Per-connection compiled-statement cache (sqlite3 default: 128). The app issues a few
+# hundred distinct query strings; keep the hot ones compiled.
+_SQLITE_CACHED_STATEMENTS = 256
 
-    if database_url and (database_url.startswith('postgres://') or database_url.startswith('postgresql://')):
+
+# SQLite's recommended cadence for refreshing planner statistics on long-lived processes.
+_SQLITE_OPTIMIZE_INTERVAL_SECONDS = 900
+_sqlite_optimize_started = False
+_sqlite_optimize_lock = threading.Lock()
+
+
+def _run_sqlite_optimize():
+    """Run PRAGMA optimize on a fresh connection, then re-arm the timer."""
+    try:
+        conn = _open_sqlite()
+        try:
+            conn.execute("PRAGMA optimize")
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.warning("SQLite PRAGMA optimize failed: %s", e)
+    _schedule_sqlite_optimize()
+
+
+def _schedule_sqlite_optimize():
+    timer = threading.Timer(_SQLITE_OPTIMIZE_INTERVAL_SECONDS, _run_sqlite_optimize)
+    timer.daemon = True
+    timer.start()
+
+
+def _ensure_sqlite_optimize_timer():
+    """Start the periodic PRAGMA optimize timer (once per process)."""
+    global _sqlite_optimize_started
+    if _sqlite_optimize_started:
+        return
+    with _sqlite_optimize_lock:
+        if not _sqlite_optimize_started:
+            _sqlite_optimize_started = True
+            _schedule_sqlite_optimize()
+
+
+def _open_sqlite(readonly=False):
+    """Open a SQLite connection with the throughput PRAGMAs applied.
+
+    Read-only connections are opened with mode=ro so they can never take the
+    write lock; under WAL they read a consistent snapshot without waiting on
+    (or blocking) the writer.
+    """
+    if readonly and Config.DB_FILE != ':memory:':
+        uri = f"file:{urllib.parse.quote(os.path.abspath(Config.DB_FILE))}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, cached_statements=_SQLITE_CACHED_STATEMENTS)
+    else:
+        conn = sqlite3.connect(Config.DB_FILE, cached_statements=_SQLITE_CACHED_STATEMENTS)
+        if Config.DB_FILE != ':memory:':
+            # Persistent on the database file; a cheap no-op once already in WAL mode.
+            conn.execute("PRAGMA journal_mode=WAL")
+    for pragma in _SQLITE_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def get_db_connection(readonly=False):
+    """Get database connection — uses pool for PostgreSQL, direct for SQLite.
+
+    Pass readonly=True for pure reads: on SQLite this opens a read-only
+    connection that never contends for the write lock. PostgreSQL ignores it
+    (MVCC readers never block writers).
+    """
+    if _IS_POSTGRES:
         pool = _get_pg_pool()
         if pool:
             try:
+                if has_request_context():
+                    return _get_request_connection(pool)
                 conn = pool.getconn()
                 return _PooledConnection(conn, pool)
             except Exception as e:
-                logger.error(f"PostgreSQL pool error: {e}")
+                logger.error("PostgreSQL pool error: %s", e)
                 return None
         else:
             try:
-                return psycopg2.connect(_pg_dsn_with_timeout(database_url))
+                return psycopg2.connect(_pg_dsn_with_timeout(_DATABASE_URL), client_encoding='UTF8')
             except Exception as e:
-                logger.error(f"PostgreSQL connection error: {e}")
+                logger.error("PostgreSQL connection error: %s", e)
                 return None
     else:
-        return sqlite3.connect(Config.DB_FILE)
+        _ensure_sqlite_optimize_timer()
+        return _open_sqlite(readonly=readonly)
+
+def get_health_connection():
+    """Connection for health probes, from the dedicated health pool on PostgreSQL.
+
+    Never request-scoped and never drawn from the main pool. Raises on failure
+    so the probe can report why. SQLite opens a read-only connection.
+    """
+    if _IS_POSTGRES:
+        pool = _get_health_pool()
+        return _PooledConnection(pool.getconn(), pool)
+    return _open_sqlite(readonly=True)
+
+
+def server_cursor(conn, name='chata_stream'):
+    """Return a cursor suited to long-running / large reads.
+
+    On PostgreSQL this is a named (server-side) cursor that streams rows in
+    batches of _SERVER_CURSOR_ITERSIZE instead of materialising the whole
+    result set client-side; it must be used inside a transaction (the default
+    for psycopg2 connections). SQLite has no server-side cursors, so a plain
+    cursor is returned. Large reads (message history, usage/activity logs)
+    should iterate this cursor rather than calling fetchall().
+    """
+    if not _IS_POSTGRES:
+        return conn.cursor()
+    cursor = conn.cursor(name=name)
+    cursor.itersize = _SERVER_CURSOR_ITERSIZE
+    return cursor
+
+
+def named_cursor(conn):
+    """Return a cursor whose rows are readable by column name (row.email / row['email']).
+
+    PostgreSQL rows are namedtuples (NamedTupleCursor); SQLite rows are sqlite3.Row.
+    Both still unpack and index like plain tuples, so templates can take them
+    directly instead of copying each row into a dict.
+    """
+    if _IS_POSTGRES:
+        return conn.cursor(cursor_factory=psycopg2.extras.NamedTupleCursor)
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+    return cursor
+
 
 def is_postgres():
     """True if DATABASE_URL is set and points to PostgreSQL (centralized dialect check)."""
-    database_url = os.environ.get('DATABASE_URL') or getattr(Config, 'DATABASE_URL', None)
-    return bool(database_url and (
-        database_url.startswith('postgres://') or database_url.startswith('postgresql://')
-    ))
+    return _IS_POSTGRES
+
+
+# The backend is fixed for the lifetime of the process, so the placeholder and
+# the default-settings SQL are resolved once at import instead of per call.
+_PARAM_PLACEHOLDER = '%s' if _IS_POSTGRES else '?'
+_DEFAULT_SETTINGS = tuple(Config.SETTINGS_DEFAULTS.items())
+# PostgreSQL: execute_values expands VALUES %s into one multi-row INSERT (one round-trip, one parse).
+_SQL_INSERT_SETTINGS_PG = "INSERT INTO settings (key, value) VALUES %s ON CONFLICT (key) DO NOTHING"
+_SQL_INSERT_SETTING_SQLITE = (
+    f"INSERT OR IGNORE INTO settings (key, value) VALUES ({_PARAM_PLACEHOLDER}, {_PARAM_PLACEHOLDER})"
+)
+
+
+# Version of the schema created by init_database(), stored in the settings table so
+# warm restarts can skip the DDL with a single SELECT. Bump it whenever the schema
+# statements or default settings below change.
+_SCHEMA_VERSION = '7'
+_SQL_SELECT_SETTING = f"SELECT value FROM settings WHERE key = {_PARAM_PLACEHOLDER}"
+_SQL_INSERT_SETTING = (
+    "INSERT INTO settings (key, value) VALUES (%s, %s) ON CONFLICT (key) DO NOTHING"
+    if _IS_POSTGRES else _SQL_INSERT_SETTING_SQLITE
+)
+# settings key marking that the one-time "no subscription, no free trial -> 0 replies"
+# backfill in init_database() has run.
+_ZERO_REPLIES_MIGRATION_KEY = 'migration_zero_replies_v1'
+# Boolean literal for the dialect; interpolated into constant SQL only, never user data.
+_FALSE_LITERAL = 'FALSE' if _IS_POSTGRES else '0'
+_SQL_ZERO_REPLIES_BACKFILL = f"""
+    UPDATE users
+    SET replies_limit_monthly = 0
+    WHERE NOT EXISTS (
+        SELECT 1 FROM subscriptions s WHERE s.user_id = users.id AND s.status = 'active'
+    )
+    AND (replies_limit_monthly IS NULL OR replies_limit_monthly > 0)
+    AND (has_received_free_trial IS NULL OR has_received_free_trial = {_FALSE_LITERAL})
+"""
+if _IS_POSTGRES:
+    _SQL_UPSERT_SCHEMA_VERSION = ("INSERT INTO settings (key, value) VALUES ('schema_version', %s) "
+                                  "ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value")
+else:
+    _SQL_UPSERT_SCHEMA_VERSION = "INSERT OR REPLACE INTO settings (key, value) VALUES ('schema_version', ?)"
+
+
+def get_param_placeholder(_placeholder=_PARAM_PLACEHOLDER):
+    """Get the correct parameter placeholder for the current database.
+
+    Called for nearly every query; the value is bound as a default argument
+    so the lookup is a local read rather than a module-global one.
+    """
+    return _placeholder
 
+# Arbitrary application-wide key for the PostgreSQL advisory lock taken by init_database().
+_INIT_LOCK_KEY = 729384
+
+
+def _acquire_init_lock(cursor):
+    """Serialize schema initialization across processes; returns a callable that releases the lock.
+
+    Every gunicorn worker imports the app and calls init_database(). Workers wait
+    for the lock instead of skipping ahead, so none starts serving (or running
+    migrations) against a half-built schema; once the holder has recorded
+    _SCHEMA_VERSION, the waiters' own version check makes their turn a single
+    SELECT. PostgreSQL uses a session advisory lock; SQLite uses an flock on a
+    sidecar file where available.
+    """
+    if _IS_POSTGRES:
+        cursor.execute("SELECT pg_advisory_lock(%s)", (_INIT_LOCK_KEY,))
+        return lambda: cursor.execute("SELECT pg_advisory_unlock(%s)", (_INIT_LOCK_KEY,))
+    if fcntl is None:
+        return lambda: None
+    lock_file = open(f"{Config.DB_FILE}.initlock", "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+    except OSError:
+        lock_file.close()
+        raise
+    return lock_file.close
 
-def get_param_placeholder():
-    """Get the correct parameter placeholder for the current database."""
-    return '%s' if is_postgres() else '?'
 
 def init_database():
     """Initialize database tables"""
     logger.info("Initializing database...")
     
-    database_url = os.environ.get('DATABASE_URL')
-    if database_url:
+    if _DATABASE_URL and logger.isEnabledFor(logging.INFO):
         try:
-            from urllib.parse import urlparse
-            parsed = urlparse(database_url)
+            parsed = urllib.parse.urlparse(_DATABASE_URL)
             safe_url = f"{parsed.scheme}://***@{parsed.hostname}:{parsed.port or 5432}/{parsed.path.lstrip('/')}"
         except Exception:
             safe_url = "postgres://***"
-        logger.info(f"Database connection - DATABASE_URL: {safe_url}")
+        logger.info("Database connection - DATABASE_URL: %s", safe_url)
     
+    init_pool()
     conn = get_db_connection()
     if not conn:
         logger.error("Failed to get database connection")
         return False
     
+    release_init_lock = None
+    connection_broken = False
     try:
         cursor = conn.cursor()
         
-        if is_postgres():
-            logger.info("Using PostgreSQL database")
-            _create_postgres_tables(cursor)
-        else:
-            logger.info("Using SQLite database")
-            _create_sqlite_tables(cursor)
+        release_init_lock = _acquire_init_lock(cursor)
         
-        # Insert default settings
-        _insert_default_settings(cursor, is_postgres())
+        # Checked under the lock: a worker that waited sees the holder's finished schema
+        if _schema_is_current(conn, cursor):
+            logger.info("Database schema already at version %s, skipping DDL", _SCHEMA_VERSION)
+        else:
+            if _IS_POSTGRES:
+                logger.info("Using PostgreSQL database")
+                _create_postgres_tables(cursor)
+            else:
+                logger.info("Using SQLite database")
+                _create_sqlite_tables(cursor)
+            # Commit the schema on its own so a failure further down cannot roll it back.
+            conn.commit()
+            
+            # Insert default settings and record the schema version (retried next boot on failure)
+            try:
+                _insert_default_settings(cursor, _IS_POSTGRES)
+                cursor.execute(_SQL_UPSERT_SCHEMA_VERSION, (_SCHEMA_VERSION,))
+                conn.commit()
+            except (psycopg2.Error, sqlite3.Error) as e:
+                conn.rollback()
+                logger.warning("Could not insert default settings: %s", e)
         
         # Set existing users without subscriptions to 0 replies ONLY if they never received free trial
-        # This preserves free trial replies that users earned
+        # This preserves free trial replies that users earned. One-time backfill: guarded by a settings marker.
         try:
-            if is_postgres():
-                cursor.execute("""
-                    UPDATE users 
-                    SET replies_limit_monthly = 0 
-                    WHERE id NOT IN (
-                        SELECT DISTINCT user_id FROM subscriptions WHERE status = 'active'
-                    ) 
-                    AND (replies_limit_monthly IS NULL OR replies_limit_monthly > 0)
-                    AND (has_received_free_trial IS NULL OR has_received_free_trial = FALSE)
-                """)
-            else:
-                cursor.execute("""
-                    UPDATE users 
-                    SET replies_limit_monthly = 0 
-                    WHERE id NOT IN (
-                        SELECT DISTINCT user_id FROM subscriptions WHERE status = 'active'
-                    ) 
-                    AND (replies_limit_monthly IS NULL OR replies_limit_monthly > 0)
-                    AND (has_received_free_trial IS NULL OR has_received_free_trial = 0)
-                """)
-            logger.info("Updated users without active subscriptions to 0 replies (preserving free trial replies)")
-        except Exception as e:
-            logger.warning(f"Could not update existing users' limits: {e}")
+            cursor.execute(_SQL_SELECT_SETTING, (_ZERO_REPLIES_MIGRATION_KEY,))
+            if cursor.fetchone() is None:
+                cursor.execute(_SQL_ZERO_REPLIES_BACKFILL)
+                cursor.execute(_SQL_INSERT_SETTING, (_ZERO_REPLIES_MIGRATION_KEY, 'done'))
+                conn.commit()
+                logger.info("Updated users without active subscriptions to 0 replies (preserving free trial replies)")
+        except (psycopg2.Error, sqlite3.Error) as e:
+            conn.rollback()
+            logger.warning("Could not update existing users' limits: %s", e)
         
-        conn.commit()
+        if not _IS_POSTGRES:
+            # Refresh planner statistics now that the schema (and any new indexes) exist.
+            cursor.execute("PRAGMA optimize")
         logger.info("Database initialized successfully")
         return True
         
     except Exception as e:
-        logger.error(f"Error initializing database: {e}")
-        logger.error(f"Error type: {type(e).__name__}")
+        logger.error("Error initializing database: %s", e)
+        logger.error("Error type: %s", type(e).__name__)
         try:
             conn.rollback()
             logger.info("Transaction rolled back, continuing...")
-        except:
-            pass
+        except (psycopg2.Error, sqlite3.Error) as rollback_error:
+            logger.warning("Rollback failed, discarding connection: %s", rollback_error)
+            connection_broken = True
         return False
     finally:
+        if release_init_lock is not None:
+            try:
+                release_init_lock()
+            except Exception as e:
+                logger.warning("Could not release database init lock: %s", e)
         try:
-            conn.close()
-        except:
-            pass
+            if connection_broken and isinstance(conn, _PooledConnection):
+                conn.discard()
+            else:
+                conn.close()
+        except (psycopg2.Error, sqlite3.Error) as e:
+            logger.warning("Could not close database connection: %s", e)
 
-def _create_postgres_tables(cursor):
-    """Create PostgreSQL tables"""
-    # Create users table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id SERIAL PRIMARY KEY,
-            username VARCHAR(255) UNIQUE NOT NULL,
-            email VARCHAR(255) UNIQUE NOT NULL,
-            password_hash VARCHAR(255) NOT NULL,
-            replies_sent_monthly INTEGER DEFAULT 0,
-            replies_limit_monthly INTEGER DEFAULT 0,
-            replies_purchased INTEGER DEFAULT 0,
-            replies_used_purchased INTEGER DEFAULT 0,
-            last_monthly_reset TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Add new columns to existing users table if they don't exist
-    try:
-        cursor.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS username VARCHAR(255)")
-        cursor.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS replies_sent_monthly INTEGER DEFAULT 0")
-        cursor.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS replies_limit_monthly INTEGER DEFAULT 0")
-        cursor.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS replies_purchased INTEGER DEFAULT 0")
-        cursor.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS replies_used_purchased INTEGER DEFAULT 0")
-        cursor.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS last_monthly_reset TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
-        cursor.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS bot_paused BOOLEAN DEFAULT FALSE")
-        cursor.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS last_warning_sent_at TIMESTAMP")
-        cursor.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS last_warning_threshold INTEGER")
-        cursor.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS has_received_free_trial BOOLEAN DEFAULT FALSE")
-    except Exception as e:
-        logger.debug(f"Some columns may already exist: {e}")
-    
-    # Create instagram_connections table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS instagram_connections (
-            id SERIAL PRIMARY KEY,
-            user_id INTEGER REFERENCES users(id),
-            instagram_user_id VARCHAR(255) NOT NULL,
-            instagram_page_id VARCHAR(255) NOT NULL,
-            instagram_page_name VARCHAR(255),
-            instagram_username VARCHAR(255),
-            page_access_token TEXT NOT NULL,
-            is_active BOOLEAN DEFAULT TRUE,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Create client_settings table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS client_settings (
-            id SERIAL PRIMARY KEY,
-            user_id INTEGER REFERENCES users(id),
-            instagram_connection_id INTEGER REFERENCES instagram_connections(id),
-            bot_personality TEXT DEFAULT 'You are a helpful and friendly Instagram bot.',
-            bot_name TEXT,
-            bot_age TEXT,
-            bot_gender TEXT,
-            bot_location TEXT,
-            bot_occupation TEXT,
-            bot_education TEXT,
-            personality_type TEXT,
-            bot_values TEXT,
-            tone_of_voice TEXT,
-            habits_quirks TEXT,
-            confidence_level TEXT,
-            emotional_range TEXT,
-            main_goal TEXT,
-            fears_insecurities TEXT,
-            what_drives_them TEXT,
-            obstacles TEXT,
-            backstory TEXT,
-            family_relationships TEXT,
-            culture_environment TEXT,
-            hobbies_interests TEXT,
-            reply_style TEXT,
-            emoji_slang TEXT,
-            conflict_handling TEXT,
-            preferred_topics TEXT,
-            use_active_hours BOOLEAN DEFAULT FALSE,
-            active_start TEXT DEFAULT '09:00',
-            active_end TEXT DEFAULT '18:00',
-            links TEXT,
-            posts TEXT,
-            conversation_samples TEXT,
-            faqs TEXT,
-            instagram_url TEXT,
-            avoid_topics TEXT,
-            blocked_users TEXT,
-            temperature REAL DEFAULT 0.7,
-            max_tokens INTEGER DEFAULT 150,
-            is_active BOOLEAN DEFAULT TRUE,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Create usage_logs table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS usage_logs (
-            id SERIAL PRIMARY KEY,
-            user_id INTEGER REFERENCES users(id),
-            instagram_connection_id INTEGER REFERENCES instagram_connections(id),
-            action VARCHAR(100) NOT NULL,
-            tokens_used INTEGER DEFAULT 0,
-            cost REAL DEFAULT 0.0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Create activity_logs table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS activity_logs (
-            id SERIAL PRIMARY KEY,
-            user_id INTEGER REFERENCES users(id),
-            action VARCHAR(100) NOT NULL,
-            details TEXT,
-            ip_address VARCHAR(45),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Create password_resets table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS password_resets (
-            id SERIAL PRIMARY KEY,
-            user_id INTEGER REFERENCES users(id),
-            token VARCHAR(255) UNIQUE NOT NULL,
-            expires_at TIMESTAMP NOT NULL,
-            used_at TIMESTAMP,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Create messages table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS messages (
-            id SERIAL PRIMARY KEY,
-            instagram_user_id VARCHAR(255) NOT NULL,
-            instagram_connection_id INTEGER REFERENCES instagram_connections(id),
-            message_text TEXT NOT NULL,
-            bot_response TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Create settings table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS settings (
-            id SERIAL PRIMARY KEY,
-            key VARCHAR(255) UNIQUE NOT NULL,
-            value TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Create purchases table for tracking purchased additional replies
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS purchases (
-            id SERIAL PRIMARY KEY,
-            user_id INTEGER REFERENCES users(id),
-            amount_paid DECIMAL(10, 2) NOT NULL,
-            replies_added INTEGER NOT NULL,
-            payment_provider VARCHAR(50),
-            payment_id VARCHAR(255),
-            status VARCHAR(50) DEFAULT 'completed',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Create subscriptions table for tracking user subscriptions
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS subscriptions (
-            id SERIAL PRIMARY KEY,
-            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-            stripe_subscription_id VARCHAR(255) UNIQUE NOT NULL,
-            stripe_customer_id VARCHAR(255) NOT NULL,
-            stripe_price_id VARCHAR(255) NOT NULL,
-            plan_type VARCHAR(50) NOT NULL,
-            status VARCHAR(50) NOT NULL,
-            current_period_start TIMESTAMP,
-            current_period_end TIMESTAMP,
-            cancel_at_period_end BOOLEAN DEFAULT FALSE,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Create stripe_webhook_events table for webhook idempotency (avoid processing same event twice)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS stripe_webhook_events (
-            event_id VARCHAR(255) PRIMARY KEY,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Indexes on instagram_connections for fast webhook lookups by recipient
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_instagram_connections_user_id ON instagram_connections(instagram_user_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_instagram_connections_page_id ON instagram_connections(instagram_page_id)")
-    cursor.execute("ALTER TABLE instagram_connections ADD COLUMN IF NOT EXISTS instagram_page_name TEXT")
-    cursor.execute("ALTER TABLE instagram_connections ADD COLUMN IF NOT EXISTS instagram_username TEXT")
-    
+
+# ---------------------------------------------------------------------------
+# Schema, described once and rendered per dialect at import
+# ---------------------------------------------------------------------------
+# A column is (name, type) or (name, type, constraints); a type is either a string
+# shared by both dialects or a (PostgreSQL, SQLite) pair. Plain strings in a
+# table's column list are table constraints and are copied verbatim.
+_PG, _SQLITE = 0, 1
+_SERIAL_PK = ('SERIAL PRIMARY KEY', 'INTEGER PRIMARY KEY AUTOINCREMENT')
+_VARCHAR = ('VARCHAR(255)', 'TEXT')
+_TIMESTAMP_NOW = 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP'
+_DATETIME_NOW = ('TIMESTAMP DEFAULT CURRENT_TIMESTAMP', 'DATETIME DEFAULT CURRENT_TIMESTAMP')
+_BOOL_TRUE = ('BOOLEAN DEFAULT TRUE', 'BOOLEAN DEFAULT 1')
+_BOOL_FALSE = ('BOOLEAN DEFAULT FALSE', 'BOOLEAN DEFAULT 0')
+
+
+def _varchar(length):
+    return (f'VARCHAR({length})', 'TEXT')
+
+
+# Tables in creation order (referenced tables first).
+_TABLES = (
+    ('users', (
+        ('id', _SERIAL_PK),
+        ('username', _VARCHAR, 'UNIQUE NOT NULL'),
+        ('email', _VARCHAR, 'UNIQUE NOT NULL'),
+        ('password_hash', _VARCHAR, 'NOT NULL'),
+        ('replies_sent_monthly', 'INTEGER DEFAULT 0'),
+        ('replies_limit_monthly', 'INTEGER DEFAULT 0'),
+        ('replies_purchased', 'INTEGER DEFAULT 0'),
+        ('replies_used_purchased', 'INTEGER DEFAULT 0'),
+        ('last_monthly_reset', _TIMESTAMP_NOW),
+        ('created_at', _TIMESTAMP_NOW),
+        ('updated_at', _TIMESTAMP_NOW),
+        ('bot_paused', _BOOL_FALSE),
+        ('last_warning_sent_at', 'TIMESTAMP'),
+        ('last_warning_threshold', 'INTEGER'),
+        ('has_received_free_trial', _BOOL_FALSE),
+    )),
+    ('instagram_connections', (
+        ('id', _SERIAL_PK),
+        ('user_id', 'INTEGER REFERENCES users(id)'),
+        ('instagram_user_id', _VARCHAR, 'NOT NULL'),
+        ('instagram_page_id', _VARCHAR, 'NOT NULL'),
+        ('instagram_page_name', _VARCHAR),
+        ('instagram_username', _VARCHAR),
+        ('page_access_token', 'TEXT', 'NOT NULL'),
+        ('is_active', _BOOL_TRUE),
+        ('created_at', _TIMESTAMP_NOW),
+        ('updated_at', _TIMESTAMP_NOW),
+    )),
+    ('client_settings', (
+        ('id', _SERIAL_PK),
+        ('user_id', 'INTEGER REFERENCES users(id)'),
+        ('instagram_connection_id', 'INTEGER REFERENCES instagram_connections(id)'),
+        ('bot_personality', "TEXT DEFAULT 'You are a helpful and friendly Instagram bot.'"),
+        *((name, 'TEXT') for name in (
+            'bot_name', 'bot_age', 'bot_gender', 'bot_location', 'bot_occupation', 'bot_education',
+            'personality_type', 'bot_values', 'tone_of_voice', 'habits_quirks', 'confidence_level',
+            'emotional_range', 'main_goal', 'fears_insecurities', 'what_drives_them', 'obstacles',
+            'backstory', 'family_relationships', 'culture_environment', 'hobbies_interests',
+            'reply_style', 'emoji_slang', 'conflict_handling', 'preferred_topics',
+        )),
+        ('use_active_hours', _BOOL_FALSE),
+        ('active_start', "TEXT DEFAULT '09:00'"),
+        ('active_end', "TEXT DEFAULT '18:00'"),
+        *((name, 'TEXT') for name in (
+            'links', 'posts', 'conversation_samples', 'faqs', 'instagram_url', 'avoid_topics', 'blocked_users',
+        )),
+        ('temperature', 'REAL DEFAULT 0.7'),
+        ('max_tokens', 'INTEGER DEFAULT 150'),
+        ('is_active', _BOOL_TRUE),
+        ('created_at', _TIMESTAMP_NOW),
+        ('updated_at', _TIMESTAMP_NOW),
+    )),
+    ('usage_logs', (
+        ('id', _SERIAL_PK),
+        ('user_id', 'INTEGER REFERENCES users(id)'),
+        ('instagram_connection_id', 'INTEGER REFERENCES instagram_connections(id)'),
+        ('action', _varchar(100), 'NOT NULL'),
+        ('tokens_used', 'INTEGER DEFAULT 0'),
+        ('cost', 'REAL DEFAULT 0.0'),
+        ('created_at', _TIMESTAMP_NOW),
+    )),
+    ('activity_logs', (
+        ('id', _SERIAL_PK),
+        ('user_id', 'INTEGER REFERENCES users(id)'),
+        ('action', _varchar(100), 'NOT NULL'),
+        ('details', 'TEXT'),
+        ('ip_address', _varchar(45)),
+        ('created_at', _TIMESTAMP_NOW),
+    )),
+    ('password_resets', (
+        ('id', _SERIAL_PK),
+        ('user_id', 'INTEGER REFERENCES users(id)'),
+        ('token', _VARCHAR, 'UNIQUE NOT NULL'),
+        ('expires_at', ('TIMESTAMP', 'DATETIME'), 'NOT NULL'),
+        ('used_at', ('TIMESTAMP', 'DATETIME')),
+        ('created_at', _DATETIME_NOW),
+    )),
+    ('messages', (
+        ('id', _SERIAL_PK),
+        ('instagram_user_id', _VARCHAR, 'NOT NULL'),
+        ('instagram_connection_id', 'INTEGER REFERENCES instagram_connections(id)'),
+        ('message_text', 'TEXT', 'NOT NULL'),
+        ('bot_response', 'TEXT', 'NOT NULL'),
+        ('created_at', _TIMESTAMP_NOW),
+        # App Review mode: bot reply saved but not sent until user clicks Send in Conversation History
+        ('sent_via_api', ('BOOLEAN DEFAULT TRUE', 'INTEGER DEFAULT 1')),
+    )),
+    ('settings', (
+        ('id', _SERIAL_PK),
+        ('key', _VARCHAR, 'UNIQUE NOT NULL'),
+        ('value', 'TEXT', 'NOT NULL'),
+        ('created_at', _DATETIME_NOW),
+        ('updated_at', _DATETIME_NOW),
+    )),
+    ('purchases', (
+        ('id', _SERIAL_PK),
+        ('user_id', 'INTEGER REFERENCES users(id)'),
+        ('amount_paid', ('DECIMAL(10, 2)', 'REAL'), 'NOT NULL'),
+        ('replies_added', 'INTEGER', 'NOT NULL'),
+        ('payment_provider', _varchar(50)),
+        ('payment_id', _VARCHAR),
+        ('status', _varchar(50), "DEFAULT 'completed'"),
+        ('created_at', _TIMESTAMP_NOW),
+    )),
+    # Stripe subscriptions
+    ('subscriptions', (
+        ('id', _SERIAL_PK),
+        ('user_id', ('INTEGER REFERENCES users(id) ON DELETE CASCADE', 'INTEGER REFERENCES users(id)')),
+        ('stripe_subscription_id', _VARCHAR, 'UNIQUE NOT NULL'),
+        ('stripe_customer_id', _VARCHAR, 'NOT NULL'),
+        ('stripe_price_id', _VARCHAR, 'NOT NULL'),
+        ('plan_type', _varchar(50), 'NOT NULL'),
+        ('status', _varchar(50), 'NOT NULL'),
+        ('current_period_start', 'TIMESTAMP'),
+        ('current_period_end', 'TIMESTAMP'),
+        ('cancel_at_period_end', ('BOOLEAN DEFAULT FALSE', 'INTEGER DEFAULT 0')),
+        ('created_at', _TIMESTAMP_NOW),
+        ('updated_at', _TIMESTAMP_NOW),
+    )),
+    # Stripe webhook idempotency: processed event ids
+    ('stripe_webhook_events', (
+        ('event_id', _VARCHAR, 'PRIMARY KEY'),
+        ('created_at', _TIMESTAMP_NOW),
+    )),
     # Instagram webhook idempotency: avoid processing same message (mid) twice on retries
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS instagram_webhook_processed_mids (
-            mid VARCHAR(512) PRIMARY KEY,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
+    ('instagram_webhook_processed_mids', (
+        ('mid', _varchar(512), 'PRIMARY KEY'),
+        ('created_at', _TIMESTAMP_NOW),
+    )),
     # Cache sender usernames for conversation history search
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS conversation_senders (
-            instagram_connection_id INTEGER REFERENCES instagram_connections(id),
-            instagram_user_id VARCHAR(255) NOT NULL,
-            username VARCHAR(255),
-            PRIMARY KEY (instagram_connection_id, instagram_user_id)
-        )
-    """)
-    # App Review mode: bot reply saved but not sent until user clicks Send in Conversation History
-    cursor.execute("ALTER TABLE messages ADD COLUMN IF NOT EXISTS sent_via_api BOOLEAN DEFAULT TRUE")
+    ('conversation_senders', (
+        ('instagram_connection_id', 'INTEGER REFERENCES instagram_connections(id)'),
+        ('instagram_user_id', _VARCHAR, 'NOT NULL'),
+        ('username', _VARCHAR),
+        'PRIMARY KEY (instagram_connection_id, instagram_user_id)',
+    )),
+)
 
-def _create_sqlite_tables(cursor):
-    """Create SQLite tables"""
-    # Create users table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            replies_sent_monthly INTEGER DEFAULT 0,
-            replies_limit_monthly INTEGER DEFAULT 0,
-            replies_purchased INTEGER DEFAULT 0,
-            replies_used_purchased INTEGER DEFAULT 0,
-            last_monthly_reset TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Add new columns to existing users table if they don't exist (SQLite doesn't support IF NOT EXISTS for ALTER TABLE)
-    try:
-        cursor.execute("ALTER TABLE users ADD COLUMN username TEXT")
-    except:
-        pass
-    try:
-        cursor.execute("ALTER TABLE users ADD COLUMN replies_sent_monthly INTEGER DEFAULT 0")
-    except:
-        pass
-    try:
-        cursor.execute("ALTER TABLE users ADD COLUMN replies_limit_monthly INTEGER DEFAULT 0")
-    except:
-        pass
-    try:
-        cursor.execute("ALTER TABLE users ADD COLUMN replies_purchased INTEGER DEFAULT 0")
-    except:
-        pass
-    try:
-        cursor.execute("ALTER TABLE users ADD COLUMN replies_used_purchased INTEGER DEFAULT 0")
-    except:
-        pass
-    try:
-        cursor.execute("ALTER TABLE users ADD COLUMN last_monthly_reset TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
-    except:
-        pass
-    try:
-        cursor.execute("ALTER TABLE users ADD COLUMN bot_paused BOOLEAN DEFAULT 0")
-    except:
-        pass
-    try:
-        cursor.execute("ALTER TABLE users ADD COLUMN last_warning_sent_at TIMESTAMP")
-    except:
-        pass
-    try:
-        cursor.execute("ALTER TABLE users ADD COLUMN last_warning_threshold INTEGER")
-    except:
-        pass
-    try:
-        cursor.execute("ALTER TABLE users ADD COLUMN has_received_free_trial BOOLEAN DEFAULT 0")
-    except:
-        pass
-    
-    # Create instagram_connections table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS instagram_connections (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER REFERENCES users(id),
-            instagram_user_id TEXT NOT NULL,
-            instagram_page_id TEXT NOT NULL,
-            instagram_page_name TEXT,
-            instagram_username TEXT,
-            page_access_token TEXT NOT NULL,
-            is_active BOOLEAN DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Create client_settings table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS client_settings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER REFERENCES users(id),
-            instagram_connection_id INTEGER REFERENCES instagram_connections(id),
-            bot_personality TEXT DEFAULT 'You are a helpful and friendly Instagram bot.',
-            bot_name TEXT,
-            bot_age TEXT,
-            bot_gender TEXT,
-            bot_location TEXT,
-            bot_occupation TEXT,
-            bot_education TEXT,
-            personality_type TEXT,
-            bot_values TEXT,
-            tone_of_voice TEXT,
-            habits_quirks TEXT,
-            confidence_level TEXT,
-            emotional_range TEXT,
-            main_goal TEXT,
-            fears_insecurities TEXT,
-            what_drives_them TEXT,
-            obstacles TEXT,
-            backstory TEXT,
-            family_relationships TEXT,
-            culture_environment TEXT,
-            hobbies_interests TEXT,
-            reply_style TEXT,
-            emoji_slang TEXT,
-            conflict_handling TEXT,
-            preferred_topics TEXT,
-            use_active_hours BOOLEAN DEFAULT 0,
-            active_start TEXT DEFAULT '09:00',
-            active_end TEXT DEFAULT '18:00',
-            links TEXT,
-            posts TEXT,
-            conversation_samples TEXT,
-            faqs TEXT,
-            instagram_url TEXT,
-            avoid_topics TEXT,
-            blocked_users TEXT,
-            temperature REAL DEFAULT 0.7,
-            max_tokens INTEGER DEFAULT 150,
-            is_active BOOLEAN DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Create usage_logs table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS usage_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER REFERENCES users(id),
-            instagram_connection_id INTEGER REFERENCES instagram_connections(id),
-            action TEXT NOT NULL,
-            tokens_used INTEGER DEFAULT 0,
-            cost REAL DEFAULT 0.0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Create activity_logs table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS activity_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER REFERENCES users(id),
-            action TEXT NOT NULL,
-            details TEXT,
-            ip_address TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Create password_resets table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS password_resets (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER REFERENCES users(id),
-            token TEXT UNIQUE NOT NULL,
-            expires_at DATETIME NOT NULL,
-            used_at DATETIME,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Create messages table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS messages (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            instagram_user_id TEXT NOT NULL,
-            instagram_connection_id INTEGER REFERENCES instagram_connections(id),
-            message_text TEXT NOT NULL,
-            bot_response TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Create settings table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS settings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            key TEXT UNIQUE NOT NULL,
-            value TEXT NOT NULL,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Create purchases table for tracking purchased additional replies
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS purchases (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER REFERENCES users(id),
-            amount_paid REAL NOT NULL,
-            replies_added INTEGER NOT NULL,
-            payment_provider TEXT,
-            payment_id TEXT,
-            status TEXT DEFAULT 'completed',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Create subscriptions table for tracking user subscriptions
-    try:
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS subscriptions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER REFERENCES users(id),
-                stripe_subscription_id TEXT UNIQUE NOT NULL,
-                stripe_customer_id TEXT NOT NULL,
-                stripe_price_id TEXT NOT NULL,
-                plan_type TEXT NOT NULL,
-                status TEXT NOT NULL,
-                current_period_start TIMESTAMP,
-                current_period_end TIMESTAMP,
-                cancel_at_period_end INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-    except Exception as e:
-        logger.debug(f"Subscriptions table may already exist: {e}")
-    
-    # Create stripe_webhook_events table for webhook idempotency
-    try:
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS stripe_webhook_events (
-                event_id TEXT PRIMARY KEY,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-    except Exception as e:
-        logger.debug(f"stripe_webhook_events table may already exist: {e}")
-    
-    # Indexes on instagram_connections for fast webhook lookups
-    try:
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_instagram_connections_user_id ON instagram_connections(instagram_user_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_instagram_connections_page_id ON instagram_connections(instagram_page_id)")
-    except Exception as e:
-        logger.debug(f"instagram_connections indexes may already exist: {e}")
-    
-    # Instagram webhook idempotency (processed message ids)
-    try:
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS instagram_webhook_processed_mids (
-                mid TEXT PRIMARY KEY,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-    except Exception as e:
-        logger.debug(f"instagram_webhook_processed_mids table may already exist: {e}")
-    try:
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS conversation_senders (
-                instagram_connection_id INTEGER REFERENCES instagram_connections(id),
-                instagram_user_id TEXT NOT NULL,
-                username TEXT,
-                PRIMARY KEY (instagram_connection_id, instagram_user_id)
-            )
-        """)
-    except Exception as e:
-        logger.debug(f"conversation_senders table may already exist: {e}")
+# Columns added after their table was first created. CREATE TABLE already includes
+# them; databases created earlier get them via ADD COLUMN (IF NOT EXISTS on
+# PostgreSQL, after a PRAGMA table_info check on SQLite).
+_ADDED_COLUMNS = {
+    'users': (
+        'username', 'replies_sent_monthly', 'replies_limit_monthly', 'replies_purchased',
+        'replies_used_purchased', 'last_monthly_reset', 'bot_paused', 'last_warning_sent_at',
+        'last_warning_threshold', 'has_received_free_trial',
+    ),
+    'instagram_connections': ('instagram_page_name', 'instagram_username'),
+    'messages': ('sent_via_api',),
+}
+
+_INDEXES = (
+    # Indexes on instagram_connections for fast webhook lookups by recipient
+    "CREATE INDEX IF NOT EXISTS idx_instagram_connections_user_id ON instagram_connections(instagram_user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_instagram_connections_page_id ON instagram_connections(instagram_page_id)",
+    # Secondary indexes for per-user / per-sender lookups (usage/activity names match update_schema)
+    "CREATE INDEX IF NOT EXISTS idx_instagram_connections_owner ON instagram_connections(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_messages_instagram_user ON messages(instagram_user_id, id DESC)",
+    # Conversation history: WHERE instagram_connection_id AND instagram_user_id ORDER BY id DESC
+    "CREATE INDEX IF NOT EXISTS idx_messages_conn_sender_id ON messages(instagram_connection_id, instagram_user_id, id)",
+    "CREATE INDEX IF NOT EXISTS idx_usage_logs_user_created ON usage_logs(user_id, created_at DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_activity_logs_user_created ON activity_logs(user_id, created_at DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_messages_conn_created_at ON messages(instagram_connection_id, created_at DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_subscriptions_user_status_created ON subscriptions(user_id, status, created_at DESC)",
+    # Admin "active subscribers" count: COUNT(DISTINCT user_id) WHERE status = 'active'
+    "CREATE INDEX IF NOT EXISTS idx_subscriptions_active_user ON subscriptions(user_id) WHERE status = 'active'",
+    # Admin dashboard "newest N" lists: ORDER BY ... DESC, id DESC LIMIT reads the index head
+    "CREATE INDEX IF NOT EXISTS idx_subscriptions_updated_at ON subscriptions(updated_at DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_instagram_connections_created_at ON instagram_connections(created_at DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_purchases_created_at ON purchases(created_at DESC, id DESC)",
+)
+
+
+def _render_column(column, dialect):
+    """Return (name, type, constraints) for one dialect; table constraints come back as (None, text, '')."""
+    if isinstance(column, str):
+        return None, column, ''
+    name, column_type, *constraints = column
+    if isinstance(column_type, tuple):
+        column_type = column_type[dialect]
+    return name, column_type, " ".join(constraints)
+
+
+def _render_schema(dialect):
+    """Return (CREATE TABLE statements, {table: {added column: type}}) for one dialect.
+
+    Added columns are declared with their type only: ADD COLUMN on a populated
+    table cannot carry the UNIQUE/NOT NULL constraints of the CREATE.
+    """
+    creates = []
+    added = {}
+    for table, columns in _TABLES:
+        rendered = [_render_column(column, dialect) for column in columns]
+        body = ", ".join(" ".join(part for part in column if part) for column in rendered)
+        creates.append(f"CREATE TABLE IF NOT EXISTS {table} ( {body} )")
+        if table in _ADDED_COLUMNS:
+            types = {name: column_type for name, column_type, _ in rendered}
+            added[table] = {name: types[name] for name in _ADDED_COLUMNS[table]}
+    return creates, added
+
+
+_pg_creates, _pg_added = _render_schema(_PG)
+# PostgreSQL schema, sent to the server as one multi-statement batch (one round-trip).
+_POSTGRES_SCHEMA_STATEMENTS = (
+    *_pg_creates,
+    # One multi-clause ALTER per table: one lock acquisition each
+    *(f"ALTER TABLE {table} " + ", ".join(f"ADD COLUMN IF NOT EXISTS {name} {definition}"
+                                          for name, definition in columns.items())
+      for table, columns in _pg_added.items()),
+    *_INDEXES,
+)
+_POSTGRES_SCHEMA_SQL = ";\n".join(_POSTGRES_SCHEMA_STATEMENTS)
+
+_sqlite_creates, _sqlite_added = _render_schema(_SQLITE)
+# SQLite schema, run as a single executescript() batch. The script opens the
+# transaction the CREATEs and ALTERs run in, so creating the schema costs one
+# commit/fsync instead of one per statement; init_database() commits it before
+# seeding settings.
+_SQLITE_SCHEMA_STATEMENTS = (*_sqlite_creates, *_INDEXES)
+_SQLITE_SCHEMA_SQL = "BEGIN;\n" + ";\n".join(_SQLITE_SCHEMA_STATEMENTS) + ";"
+# (table, column, definition) for _create_sqlite_tables() to add where missing.
+_SQLITE_ADDED_COLUMNS = tuple(
+    (table, name, definition)
+    for table, columns in _sqlite_added.items()
+    for name, definition in columns.items()
+)
+del _pg_creates, _pg_added, _sqlite_creates, _sqlite_added
+
+
+def _schema_is_current(conn, cursor):
+    """True if the settings table records the current _SCHEMA_VERSION.
+
+    A fresh database has no settings table yet; on PostgreSQL the failed probe
+    aborts the transaction, so it is rolled back before the DDL runs.
+    """
     try:
-        cursor.execute("ALTER TABLE messages ADD COLUMN sent_via_api INTEGER DEFAULT 1")
-    except Exception as e:
-        logger.debug(f"messages.sent_via_api column may already exist: {e}")
+        cursor.execute(_SQL_SELECT_SETTING, ('schema_version',))
+        row = cursor.fetchone()
+    except psycopg2.Error:
+        conn.rollback()
+        return False
+    except sqlite3.OperationalError:
+        return False
+    return row is not None and row[0] == _SCHEMA_VERSION
+
+
+def _create_postgres_tables(cursor):
+    """Create PostgreSQL tables"""
+    cursor.execute(_POSTGRES_SCHEMA_SQL)
+
+
+_SQLITE_NOW_DEFAULT = ' DEFAULT CURRENT_TIMESTAMP'
+
+
+def _create_sqlite_tables(cursor):
+    """Create SQLite tables (and add missing columns) in one executescript() batch"""
+    existing = {}
+    alters = []
+    for table, column, definition in _SQLITE_ADDED_COLUMNS:
+        if table not in existing:
+            cursor.execute(f"PRAGMA table_info({table})")
+            existing[table] = {row[1] for row in cursor.fetchall()}
+        # An empty column set means the table does not exist yet and the CREATE adds everything.
+        if existing[table] and column not in existing[table]:
+            if definition.endswith(_SQLITE_NOW_DEFAULT):
+                # SQLite rejects ADD COLUMN with a non-constant default (and would abort the
+                # whole script): add the column bare and backfill existing rows instead.
+                alters.append(f"ALTER TABLE {table} ADD COLUMN {column} {definition[:-len(_SQLITE_NOW_DEFAULT)]};")
+                alters.append(f"UPDATE {table} SET {column} = CURRENT_TIMESTAMP;")
+            else:
+                alters.append(f"ALTER TABLE {table} ADD COLUMN {column} {definition};")
+    cursor.executescript("\n".join([_SQLITE_SCHEMA_SQL] + alters))
 
 def _insert_default_settings(cursor, is_postgres):
-    """Insert default settings into the database"""
-    param = get_param_placeholder()
-    
+    """Insert default settings into the database (existing keys are left untouched)"""
     if is_postgres:
-        # PostgreSQL syntax
-        cursor.execute(f"SELECT id FROM settings WHERE key = {param}", ('bot_personality',))
-        if not cursor.fetchone():
-            cursor.execute(f"INSERT INTO settings (key, value) VALUES ({param}, {param})", 
-                          ('bot_personality', 'You are a helpful and friendly Instagram bot.'))
-        
-        cursor.execute(f"SELECT id FROM settings WHERE key = {param}", ('temperature',))
-        if not cursor.fetchone():
-            cursor.execute(f"INSERT INTO settings (key, value) VALUES ({param}, {param})", 
-                          ('temperature', '0.7'))
-        
-        cursor.execute(f"SELECT id FROM settings WHERE key = {param}", ('max_tokens',))
-        if not cursor.fetchone():
-            cursor.execute(f"INSERT INTO settings (key, value) VALUES ({param}, {param})", 
-                          ('max_tokens', '150'))
+        psycopg2.extras.execute_values(cursor, _SQL_INSERT_SETTINGS_PG, _DEFAULT_SETTINGS, page_size=100)
     else:
-        # SQLite syntax
-        cursor.execute(f"INSERT OR IGNORE INTO settings (key, value) VALUES ({param}, {param})", 
-                      ('bot_personality', 'You are a helpful and friendly Instagram bot.'))
-        cursor.execute(f"INSERT OR IGNORE INTO settings (key, value) VALUES ({param}, {param})", 
-                      ('temperature', '0.7'))
-        cursor.execute(f"INSERT OR IGNORE INTO settings (key, value) VALUES ({param}, {param})", 
-                      ('max_tokens', '150'))
+        cursor.executemany(_SQL_INSERT_SETTING_SQLITE, _DEFAULT_SETTINGS)
@@ -3,19 +3,59 @@ Flask extensions — created here so both app.py and blueprints can import
 without circular dependencies.
 
 Usage:
-    from extensions import limiter, csrf
+    from extensions import limiter, csrf, server_session
+    from extensions import LIMIT_LOGIN  # route limits live here too (see RATE_LIMITS.md)
 """
-import os
+import redis
 from flask_limiter import Limiter  # type: ignore[reportMissingImports]
 from flask_limiter.util import get_remote_address  # type: ignore[reportMissingImports]
 from flask_wtf.csrf import CSRFProtect  # type: ignore[reportMissingImports]
+from flask_session import Session  # type: ignore[reportMissingImports]
+from limits import parse_many  # type: ignore[reportMissingImports]
 
-# Rate limit storage: prefer explicit RATE_LIMIT_STORAGE_URI, then REDIS_URL, then memory://.
-# memory:// is per-worker and broken in multi-worker production; Redis is required.
-_storage_uri = (
-    os.environ.get("RATE_LIMIT_STORAGE_URI")
-    or os.environ.get("REDIS_URL")
-    or "memory://"
+from config import Config
+
+# Route limits (per IP). Kept in one place so RATE_LIMITS.md has a single source,
+# and validated below so a typo fails at import instead of on the first request.
+LIMIT_DEFAULT = ["400 per day", "100 per hour"]
+LIMIT_SIGNUP = "10 per 5 minutes"
+LIMIT_LOGIN = "10 per minute"
+LIMIT_FORGOT_PASSWORD = "5 per 15 minutes"
+LIMIT_RESET_PASSWORD = "10 per 15 minutes"
+LIMIT_OAUTH_CALLBACK = "20 per hour"
+LIMIT_STRIPE_WEBHOOK = "200 per minute"
+LIMIT_INSTAGRAM_WEBHOOK = "150 per minute"
+for _limit in (*LIMIT_DEFAULT, LIMIT_SIGNUP, LIMIT_LOGIN, LIMIT_FORGOT_PASSWORD, LIMIT_RESET_PASSWORD,
+               LIMIT_OAUTH_CALLBACK, LIMIT_STRIPE_WEBHOOK, LIMIT_INSTAGRAM_WEBHOOK):
+    parse_many(_limit)
+del _limit
+
+# Redis limiter storage gets a bounded, blocking pool with the same timeouts as the
+# app's Redis client: a burst waits briefly for a connection instead of opening new
+# sockets without limit, and a hung Redis fails fast.
+_limiter_storage_options = {}
+if Config.RATE_LIMIT_STORAGE_URI.startswith(("redis://", "rediss://")):
+    _limiter_storage_options = {
+        "connection_pool": redis.BlockingConnectionPool.from_url(
+            Config.RATE_LIMIT_STORAGE_URI,
+            max_connections=Config.REDIS_MAX_CONNECTIONS,
+            timeout=Config.REDIS_SOCKET_TIMEOUT_SECONDS,
+            socket_keepalive=True,
+            socket_connect_timeout=Config.REDIS_SOCKET_TIMEOUT_SECONDS,
+            socket_timeout=Config.REDIS_SOCKET_TIMEOUT_SECONDS,
+            health_check_interval=30,
+        ),
+    }
+
+# Rate limit storage: Config.RATE_LIMIT_STORAGE_URI (RATE_LIMIT_STORAGE_URI, then REDIS_URL, then memory://).
+# memory:// is per-worker and broken in multi-worker production; Config.check_rate_limit_storage() refuses it there.
+limiter = Limiter(
+    key_func=get_remote_address,
+    default_limits=LIMIT_DEFAULT,
+    storage_uri=Config.RATE_LIMIT_STORAGE_URI,
+    storage_options=_limiter_storage_options,
+    strategy=Config.RATE_LIMIT_STRATEGY,
 )
-limiter = Limiter(key_func=get_remote_address, default_limits=["400 per day", "100 per hour"], storage_uri=_storage_uri)
 csrf = CSRFProtect()
+# Redis-backed sessions; app.py only initialises it when Config.SESSION_STORAGE == "redis".
+server_session = Session()
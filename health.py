@@ -2,75 +2,193 @@
 Health check and monitoring utilities
 """
 import os
-from datetime import datetime
-from database import get_db_connection
+import threading
+import time
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import lru_cache
+from database import get_health_connection, is_postgres, pool_stats
 from config import Config
+from jobs.queue import get_redis_connection
+
+# Imported once for the presence check; services.ai sets the key on the client.
+try:
+    import openai  # noqa: F401
+    _OPENAI_IMPORT_ERROR = None
+except ImportError as e:
+    _OPENAI_IMPORT_ERROR = str(e)
+
+# Sub-checks run in parallel, so a probe costs max(check) rather than sum(check).
+# A check still running after this many seconds is reported unhealthy.
+_CHECK_TIMEOUT_SECONDS = 2
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="health-check")
+
+# Probes arrive every few seconds from every load balancer and orchestrator;
+# within this window they share one result. Concurrent misses wait on the lock
+# instead of each running their own probe.
+_HEALTH_TTL = float(os.getenv("HEALTH_TTL_SECONDS", "2"))
+_HEALTH_CACHE = {"ts": 0.0, "value": None}
+_health_lock = threading.Lock()
+_health_cache_hits = 0
+
+
+# Fixed for the life of the process (DATABASE_URL is read once by database.py).
+_PRODUCTION = is_postgres()
 
 
 def _is_production():
     """True when running in production (PostgreSQL in use)."""
-    url = os.environ.get("DATABASE_URL") or getattr(Config, "DATABASE_URL", None)
-    return bool(url and (url.startswith("postgres://") or url.startswith("postgresql://")))
+    return _PRODUCTION
+
+
+def _unhealthy(production, detail):
+    """Status string for a failed check; production hides the detail."""
+    return "unhealthy" if production else f"unhealthy: {detail}"
+
+
+# On PostgreSQL the probe is bounded server-side too; SET LOCAL ends with the
+# transaction, which the pool rolls back on return. One round-trip for both.
+_DB_PROBE_SQL = "SET LOCAL statement_timeout = 500; SELECT 1" if _PRODUCTION else "SELECT 1"
+
+
+def _check_database(production):
+    try:
+        conn = get_health_connection()
+        try:
+            # execute() raising is the failure signal; no row needs fetching.
+            with closing(conn.cursor()) as cursor:
+                cursor.execute(_DB_PROBE_SQL)
+        finally:
+            conn.close()
+        return "healthy"
+    except Exception as e:
+        return _unhealthy(production, str(e))
+
+
+def _check_redis(production):
+    """PING on the shared queue client: webhook processing is dead without Redis."""
+    try:
+        get_redis_connection().ping()
+        return "healthy"
+    except Exception as e:
+        return _unhealthy(production, str(e))
+
+
+# The environment does not change inside a running process (config has already
+# loaded .env by the time this module is imported), so it is checked once.
+_REQUIRED_VARS = (
+    'OPENAI_API_KEY',
+    'FACEBOOK_APP_ID',
+    'FACEBOOK_APP_SECRET',
+    'SECRET_KEY',
+    'VERIFY_TOKEN',
+    'REDIS_URL',
+    'STRIPE_SECRET_KEY',
+    'STRIPE_WEBHOOK_SECRET',
+)
+_MISSING_VARS = tuple(var for var in _REQUIRED_VARS if not os.environ.get(var))
+_ENV_CHECK_DETAIL = f"missing {', '.join(_MISSING_VARS)}"
+
+
+def _check_environment(production):
+    if _MISSING_VARS:
+        return _unhealthy(production, _ENV_CHECK_DETAIL)
+    return "healthy"
+
+
+@lru_cache(maxsize=1)
+def _openai_key_ok(api_key):
+    """Format check, computed once per key value (a rotated key is re-checked)."""
+    return bool(api_key and api_key.startswith('sk-'))
 
 
-def health_check():
+def _check_openai(production):
+    """Check OpenAI API (basic connectivity)"""
+    if _OPENAI_IMPORT_ERROR:
+        return _unhealthy(production, _OPENAI_IMPORT_ERROR)
+    if _openai_key_ok(Config.OPENAI_API_KEY):
+        return "healthy"
+    return _unhealthy(production, "invalid API key format")
+
+
+_CHECKS = (
+    ("database", _check_database),
+    ("redis", _check_redis),
+    ("environment", _check_environment),
+    ("openai", _check_openai),
+)
+
+
+_ts_cache = (0, "")
+
+
+def _iso_now():
+    """UTC ISO-8601 timestamp (second resolution), formatted at most once per second."""
+    global _ts_cache
+    now = int(time.time())
+    cached = _ts_cache
+    if cached[0] != now:
+        cached = (now, time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(now)))
+        _ts_cache = cached
+    return cached[1]
+
+
+def _cached_health():
+    """Last probe result if still within _HEALTH_TTL, else None."""
+    global _health_cache_hits
+    value = _HEALTH_CACHE["value"]
+    if value is not None and time.monotonic() - _HEALTH_CACHE["ts"] < _HEALTH_TTL:
+        _health_cache_hits += 1
+        return value
+    return None
+
+
+def health_check(detailed=False):
     """Comprehensive health check for the application.
     In production, checks return only 'healthy' or 'unhealthy' (no env var names or exception details).
+    Results are reused for HEALTH_TTL_SECONDS (default 2); the timestamp is always current.
+    With detailed=True the PostgreSQL connection pool counters are included as "database_pool"
+    and the result cache counters as "health_cache".
     """
+    result = _cached_health()
+    if result is None:
+        with _health_lock:
+            result = _cached_health()
+            if result is None:
+                result = _run_checks()
+                _HEALTH_CACHE["value"] = result
+                _HEALTH_CACHE["ts"] = time.monotonic()
+
     health_status = {
-        "status": "healthy",
-        "timestamp": datetime.utcnow().isoformat(),
-        "checks": {}
+        "status": result["status"],
+        "timestamp": _iso_now(),
+        "checks": dict(result["checks"])
     }
+    if detailed:
+        health_status["database_pool"] = pool_stats()
+        health_status["health_cache"] = {
+            "ttl_seconds": _HEALTH_TTL,
+            "hits": _health_cache_hits,
+        }
+
+    return health_status
+
+
+def _run_checks():
+    """Run every sub-check once and merge the results."""
+    health_status = {"status": "healthy", "checks": {}}
     production = _is_production()
 
-    # Check database connection
-    try:
-        conn = get_db_connection()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1")
-            cursor.fetchone()
-            conn.close()
-            health_status["checks"]["database"] = "healthy"
+    futures = [(name, _executor.submit(check, production)) for name, check in _CHECKS]
+    wait([future for _, future in futures], timeout=_CHECK_TIMEOUT_SECONDS)
+    for name, future in futures:
+        if future.done():
+            status = future.result()
         else:
-            health_status["checks"]["database"] = "unhealthy"
+            status = _unhealthy(production, "timeout")
+        health_status["checks"][name] = status
+        if status != "healthy":
             health_status["status"] = "unhealthy"
-    except Exception as e:
-        health_status["checks"]["database"] = "unhealthy" if production else f"unhealthy: {str(e)}"
-        health_status["status"] = "unhealthy"
-
-    # Check environment variables
-    required_vars = [
-        'OPENAI_API_KEY',
-        'FACEBOOK_APP_ID',
-        'FACEBOOK_APP_SECRET',
-        'SECRET_KEY',
-        'VERIFY_TOKEN',
-        'REDIS_URL',
-        'STRIPE_SECRET_KEY',
-        'STRIPE_WEBHOOK_SECRET',
-    ]
-    missing_vars = [var for var in required_vars if not os.getenv(var)]
-    if missing_vars:
-        health_status["checks"]["environment"] = "unhealthy" if production else f"unhealthy: missing {', '.join(missing_vars)}"
-        health_status["status"] = "unhealthy"
-    else:
-        health_status["checks"]["environment"] = "healthy"
-
-    # Check OpenAI API (basic connectivity)
-    try:
-        import openai
-        openai.api_key = Config.OPENAI_API_KEY
-        if Config.OPENAI_API_KEY and Config.OPENAI_API_KEY.startswith('sk-'):
-            health_status["checks"]["openai"] = "healthy"
-        else:
-            health_status["checks"]["openai"] = "unhealthy" if production else "unhealthy: invalid API key format"
-            health_status["status"] = "unhealthy"
-    except Exception as e:
-        health_status["checks"]["openai"] = "unhealthy" if production else f"unhealthy: {str(e)}"
-        health_status["status"] = "unhealthy"
-
     return health_status
 
 def get_system_info():
@@ -79,5 +197,5 @@ def get_system_info():
         "python_version": os.sys.version,
         "environment": os.getenv("FLASK_ENV", "development"),
         "database_type": "postgresql" if os.getenv("DATABASE_URL") else "sqlite",
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": _iso_now()
     }
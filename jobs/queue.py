@@ -1,5 +1,10 @@
 """RQ queue helpers for webhook processing."""
+import hashlib
+import json
 import logging
+import random
+import threading
+import zlib
 from redis import Redis
 from rq import Queue, Retry
 
@@ -7,37 +12,149 @@ from config import Config
 
 logger = logging.getLogger("chata.jobs.queue")
 
+try:
+    import orjson
+
+    def _canonical_json(payload):
+        return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+except ImportError:  # optional; same digest input, just slower
+    def _canonical_json(payload):
+        return json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+# One client (and so one connection pool) and one set of Queues per process,
+# so enqueues reuse warm sockets instead of reconnecting per webhook batch.
 _redis_conn = None
+_webhook_queues = None
+_lock = threading.Lock()
 
 
 def get_redis_connection():
     global _redis_conn
     if _redis_conn is None:
-        if not Config.REDIS_URL:
-            raise RuntimeError("REDIS_URL is required for background processing.")
-        _redis_conn = Redis.from_url(Config.REDIS_URL)
+        with _lock:
+            if _redis_conn is None:
+                if not Config.REDIS_URL:
+                    raise RuntimeError("REDIS_URL is required for background processing.")
+                _redis_conn = Redis.from_url(
+                    Config.REDIS_URL,
+                    socket_keepalive=True,
+                    socket_connect_timeout=Config.REDIS_SOCKET_TIMEOUT_SECONDS,
+                    socket_timeout=Config.REDIS_SOCKET_TIMEOUT_SECONDS,
+                    health_check_interval=30,
+                    max_connections=Config.REDIS_MAX_CONNECTIONS,
+                )
     return _redis_conn
 
 
-def get_webhook_queue():
-    return Queue(
-        Config.RQ_QUEUE_NAME,
-        connection=get_redis_connection(),
-        default_timeout=Config.RQ_DEFAULT_TIMEOUT_SECONDS,
+def webhook_queue_names():
+    """Names of the webhook queues, in shard order (what jobs.worker listens on)."""
+    if Config.RQ_QUEUE_SHARDS == 1:
+        return (Config.RQ_QUEUE_NAME,)
+    return tuple(f"{Config.RQ_QUEUE_NAME}:{shard}" for shard in range(Config.RQ_QUEUE_SHARDS))
+
+
+def get_webhook_queues():
+    global _webhook_queues
+    if _webhook_queues is None:
+        connection = get_redis_connection()
+        with _lock:
+            if _webhook_queues is None:
+                _webhook_queues = tuple(
+                    Queue(
+                        name,
+                        connection=connection,
+                        default_timeout=Config.RQ_DEFAULT_TIMEOUT_SECONDS,
+                    )
+                    for name in webhook_queue_names()
+                )
+    return _webhook_queues
+
+
+def get_webhook_queue(sender_id=None):
+    """Queue for a sender; crc32 keeps the shard stable across processes (hash() is salted)."""
+    queues = get_webhook_queues()
+    if len(queues) == 1 or sender_id is None:
+        return queues[0]
+    return queues[zlib.crc32(str(sender_id).encode()) % len(queues)]
+
+
+_RETRY_ATTEMPTS = 5
+_RETRY_BASE_SECONDS = 5
+_RETRY_CAP_SECONDS = 300
+
+
+def _retry_policy():
+    """Exponential backoff (~5s, 10s, 20s, 40s, 80s) with per-job jitter.
+
+    Fixed intervals made every job that failed during an outage retry in
+    lock-step; jitter of 0.5x-1.5x spreads them out.
+    """
+    return Retry(
+        max=_RETRY_ATTEMPTS,
+        interval=[
+            min(_RETRY_CAP_SECONDS, int(_RETRY_BASE_SECONDS * 2 ** attempt * (0.5 + random.random())))
+            for attempt in range(_RETRY_ATTEMPTS)
+        ],
     )
 
 
+def _dedupe_key(incoming_by_sender):
+    """Redis key for a digest of the batch, or None when deduplication is off."""
+    if Config.WEBHOOK_DEDUPE_TTL_SECONDS <= 0:
+        return None
+    digest = hashlib.blake2b(_canonical_json(incoming_by_sender), digest_size=16).hexdigest()
+    return f"{Config.RQ_QUEUE_NAME}:dedupe:{digest}"
+
+
+def _claim_batch(dedupe_key):
+    """SET NX the batch's dedupe key; False if the same batch was already enqueued.
+
+    One Redis round-trip in front of the OpenAI/DB work, so a redelivered
+    webhook is dropped here instead of being processed again.
+    """
+    if dedupe_key is None:
+        return True
+    return bool(get_redis_connection().set(dedupe_key, "1", nx=True, ex=Config.WEBHOOK_DEDUPE_TTL_SECONDS))
+
+
 def enqueue_incoming_messages(incoming_by_sender):
-    """Enqueue incoming sender batches with retry/backoff policy."""
-    queue = get_webhook_queue()
-    retry = Retry(max=5, interval=[5, 15, 30, 60, 120])
-    job = queue.enqueue(
-        "jobs.webhook_tasks.process_incoming_messages_task",
-        incoming_by_sender,
-        retry=retry,
-        job_timeout=Config.RQ_DEFAULT_TIMEOUT_SECONDS,
-        result_ttl=3600,
-        failure_ttl=7 * 24 * 3600,
-    )
-    logger.info(f"Enqueued webhook processing job_id={job.id} sender_batches={len(incoming_by_sender)}")
-    return job.id
+    """Enqueue incoming sender batches with retry/backoff policy.
+
+    Each sender gets its own job (senders are processed independently, so one
+    failing sender no longer retries the others) on its shard's queue. All
+    jobs go out in a single Redis pipeline: one round-trip per webhook batch.
+    Returns the job ids (empty if the batch is a duplicate).
+    """
+    dedupe_key = _dedupe_key(incoming_by_sender)
+    if not _claim_batch(dedupe_key):
+        logger.info(f"Duplicate webhook batch skipped sender_batches={len(incoming_by_sender)}")
+        return []
+    jobs_by_queue = {}
+    for sender_id, events in incoming_by_sender.items():
+        jobs_by_queue.setdefault(get_webhook_queue(sender_id), []).append(
+            Queue.prepare_data(
+                "jobs.webhook_tasks.process_incoming_messages_task",
+                args=({sender_id: events},),
+                retry=_retry_policy(),
+                timeout=Config.RQ_DEFAULT_TIMEOUT_SECONDS,
+                result_ttl=3600,
+                failure_ttl=7 * 24 * 3600,
+            )
+        )
+    jobs = []
+    try:
+        with get_redis_connection().pipeline() as pipe:
+            for queue, job_datas in jobs_by_queue.items():
+                jobs.extend(queue.enqueue_many(job_datas, pipeline=pipe))
+            pipe.execute()
+    except Exception:
+        # Nothing was enqueued: release the claim so Meta's redelivery isn't dropped as a duplicate
+        if dedupe_key is not None:
+            try:
+                get_redis_connection().delete(dedupe_key)
+            except Exception as e:
+                logger.warning(f"Could not release webhook dedupe key {dedupe_key}: {e}")
+        raise
+    job_ids = [job.id for job in jobs]
+    logger.info(f"Enqueued webhook processing job_ids={job_ids} sender_batches={len(incoming_by_sender)}")
+    return job_ids
@@ -1,25 +1,38 @@
 """RQ task entry points for webhook processing."""
 import json
 import logging
+from contextlib import closing
+
+from rq import get_current_job
 
 from database import get_db_connection, get_param_placeholder
 from services.webhook_processor import process_incoming_messages
 
+try:
+    import orjson
+
+    def _dumps(payload):
+        return orjson.dumps(payload).decode("utf-8")
+except ImportError:  # optional; stdlib json produces the same TEXT
+    _dumps = json.dumps
+
 logger = logging.getLogger("chata.jobs.webhook_tasks")
 
 
+_ph = get_param_placeholder()
+_SQL_INSERT_DEAD_LETTER = (
+    f"INSERT INTO webhook_dead_letters (source, payload_json, reason, retries) "
+    f"VALUES ({_ph}, {_ph}, {_ph}, {_ph})"
+)
+
+
 def _store_dead_letter(payload, reason, retries=0):
     conn = get_db_connection()
     if not conn:
         return
     try:
-        ph = get_param_placeholder()
-        cursor = conn.cursor()
-        cursor.execute(
-            f"INSERT INTO webhook_dead_letters (source, payload_json, reason, retries) "
-            f"VALUES ({ph}, {ph}, {ph}, {ph})",
-            ("instagram", json.dumps(payload), reason, retries),
-        )
+        with closing(conn.cursor()) as cursor:
+            cursor.execute(_SQL_INSERT_DEAD_LETTER, ("instagram", _dumps(payload), reason, retries))
         conn.commit()
     except Exception as e:
         logger.error(f"Failed to store dead letter: {e}")
@@ -28,13 +41,22 @@ def _store_dead_letter(payload, reason, retries=0):
 
 
 def process_incoming_messages_task(incoming_by_sender):
-    """Called by rq worker. Wraps process_incoming_messages with dead-letter capture."""
+    """Called by rq worker. Wraps process_incoming_messages with dead-letter capture.
+
+    A failure that RQ will retry is not dead yet, so only the final attempt
+    pays for the dead-letter INSERT.
+    """
     try:
         process_incoming_messages(incoming_by_sender)
     except Exception as exc:
         logger.exception(f"Webhook task failed: {exc}")
+        job = get_current_job()
+        if job is not None and job.should_retry:
+            raise
+        # Retries actually made (RQ counts them per job), not the configured budget
+        retries = (job.number_of_retries or 0) if job is not None else 0
         try:
-            _store_dead_letter(incoming_by_sender, str(exc))
+            _store_dead_letter(incoming_by_sender, str(exc), retries=retries)
         except Exception:
             pass
         raise
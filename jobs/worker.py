@@ -0,0 +1,39 @@
+"""RQ worker entrypoint for webhook processing.
+
+Usage:
+    python -m jobs.worker            # every webhook queue shard
+    python -m jobs.worker chata-webhooks:0 chata-webhooks:1   # a subset of shards
+"""
+import sys
+
+from redis import Redis
+from rq import Worker
+from rq.worker import DequeueStrategy
+
+from config import Config
+from jobs.queue import webhook_queue_names
+
+
+def main(argv=None):
+    names = webhook_queue_names()
+    requested = tuple(argv if argv is not None else sys.argv[1:]) or names
+    unknown = [name for name in requested if name not in names]
+    if unknown:
+        raise SystemExit(f"Unknown webhook queue(s) {unknown}; RQ_QUEUE_SHARDS={Config.RQ_QUEUE_SHARDS} gives {list(names)}")
+    if not Config.REDIS_URL:
+        raise SystemExit("REDIS_URL is required for background processing.")
+
+    # Not the app's shared client: its socket timeout would cut off the worker's blocking dequeue.
+    connection = Redis.from_url(Config.REDIS_URL, socket_keepalive=True, health_check_interval=30)
+    worker = Worker(requested, connection=connection)
+    # Round-robin so a busy shard can't starve the others; the scheduler runs the
+    # delayed retries queued by the webhook job retry policy.
+    worker.work(
+        logging_level=Config.LOG_LEVEL,
+        with_scheduler=True,
+        dequeue_strategy=DequeueStrategy.ROUND_ROBIN,
+    )
+
+
+if __name__ == "__main__":
+    main()
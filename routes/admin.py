@@ -1,137 +1,163 @@
 """Admin routes — admin dashboard, cleanup, system verification."""
 import logging
-from flask import Blueprint, request, render_template, redirect, url_for, flash, session
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from flask import Blueprint, request, render_template, redirect, url_for, flash, session, g
 import os
+import time
 import traceback
 import stripe
 from config import Config
 
 logger = logging.getLogger("chata.routes.admin")
-from database import get_db_connection, get_param_placeholder, is_postgres
+from database import get_db_connection, get_param_placeholder, is_postgres, named_cursor
+from services import users_cache
 from services.auth import admin_required
 
 admin_bp = Blueprint('admin', __name__)
 
+# Independent admin-page I/O (the Stripe probe, the dashboard queries) runs here
+# so a page costs its slowest call rather than the sum of all of them.
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="admin")
 
-@admin_bp.route("/payment-system-verification")
-@admin_required
-def payment_system_verification():
-    """Comprehensive payment system verification and checkup"""
-    from datetime import datetime
-    
-    checks = {
-        'stripe_config': {},
-        'database_structure': {},
-        'webhook_config': {},
-        'reply_logic': {},
-        'subscriptions': {},
-        'environment': {}
-    }
-    
-    # 1. Stripe Configuration Checks
-    stripe_checks = []
-    stripe_ok = True
-    
-    if Config.STRIPE_SECRET_KEY:
-        stripe_checks.append(('✅', 'STRIPE_SECRET_KEY', 'Set'))
-        try:
-            stripe.api_key = Config.STRIPE_SECRET_KEY
-            stripe.Account.retrieve()  # Test connection
-            stripe_checks.append(('✅', 'Stripe API Connection', 'Working'))
-        except Exception as e:
-            stripe_checks.append(('❌', 'Stripe API Connection', f'Failed: {str(e)[:50]}'))
-            stripe_ok = False
-    else:
-        stripe_checks.append(('❌', 'STRIPE_SECRET_KEY', 'Missing'))
-        stripe_ok = False
-    
-    stripe_checks.append(('✅' if Config.STRIPE_PUBLISHABLE_KEY else '❌', 'STRIPE_PUBLISHABLE_KEY', 'Set' if Config.STRIPE_PUBLISHABLE_KEY else 'Missing'))
-    stripe_checks.append(('✅' if Config.STRIPE_WEBHOOK_SECRET else '❌', 'STRIPE_WEBHOOK_SECRET', 'Set' if Config.STRIPE_WEBHOOK_SECRET else 'Missing'))
-    
-    # Price IDs
-    starter_price_id = Config.STRIPE_STARTER_PLAN_PRICE_ID or os.getenv("STRIPE_STARTER_PLAN_PRICE_ID")
-    standard_price_id = Config.STRIPE_STANDARD_PLAN_PRICE_ID or os.getenv("STRIPE_STANDARD_PLAN_PRICE_ID")
-    addon_price_id = Config.STRIPE_ADDON_PRICE_ID or os.getenv("STRIPE_ADDON_PRICE_ID")
-    
-    stripe_checks.append(('✅' if starter_price_id else '❌', 'Starter Plan Price ID', starter_price_id[:20] + '...' if starter_price_id else 'Missing'))
-    stripe_checks.append(('✅' if standard_price_id else '❌', 'Standard Plan Price ID', standard_price_id[:20] + '...' if standard_price_id else 'Missing'))
-    stripe_checks.append(('✅' if addon_price_id else '❌', 'Add-on Price ID', addon_price_id[:20] + '...' if addon_price_id else 'Missing'))
-    
-    checks['stripe_config'] = {'checks': stripe_checks, 'all_ok': stripe_ok}
-    
-    # 2. Database Structure Checks
+
+# Reuse the probe result across refreshes/admins: 60s when it worked, 5s after a
+# failure so a fixed key or outage shows up quickly.
+_STRIPE_PROBE_OK_TTL = 60
+_STRIPE_PROBE_FAIL_TTL = 5
+_stripe_probe_cache = (0.0, None)  # (expires_at monotonic, result)
+
+# One client per process: its HTTP session keeps the connection to Stripe alive
+# between probes instead of paying a TCP+TLS handshake each time.
+_stripe_client = stripe.StripeClient(Config.STRIPE_SECRET_KEY) if Config.STRIPE_SECRET_KEY else None
+
+
+CRITICAL_ENV_KEYS = (
+    'STRIPE_SECRET_KEY',
+    'STRIPE_PUBLISHABLE_KEY',
+    'STRIPE_WEBHOOK_SECRET',
+    'STRIPE_STARTER_PLAN_PRICE_ID',
+    'STRIPE_STANDARD_PLAN_PRICE_ID',
+    'STRIPE_ADDON_PRICE_ID',
+)
+
+
+@lru_cache(maxsize=1)
+def _critical_env():
+    """Values of CRITICAL_ENV_KEYS, read once per process (the environment is fixed at boot)."""
+    return {key: os.getenv(key) for key in CRITICAL_ENV_KEYS}
+
+
+def _probe_stripe():
+    """Stripe API connectivity check row and whether it passed (cached)."""
+    global _stripe_probe_cache
+    expires_at, result = _stripe_probe_cache
+    if result is not None and time.monotonic() < expires_at:
+        return result
+    try:
+        _stripe_client.v1.accounts.retrieve_current()  # Test connection
+        result, ttl = (('✅', 'Stripe API Connection', 'Working'), True), _STRIPE_PROBE_OK_TTL
+    except Exception as e:
+        result, ttl = (('❌', 'Stripe API Connection', f'Failed: {str(e)[:50]}'), False), _STRIPE_PROBE_FAIL_TTL
+    _stripe_probe_cache = (time.monotonic() + ttl, result)
+    return result
+
+
+def _kv(name, present, detail='Set'):
+    """A verification row: (icon, name, detail) when present, else the shared missing row."""
+    return ('✅', name, detail) if present else ('❌', name, 'Missing')
+
+
+def _rollback_quietly(cursor):
+    """Clear a failed statement so the next check can reuse the connection (PostgreSQL aborts the transaction)."""
+    try:
+        cursor.connection.rollback()
+    except Exception:
+        pass
+
+
+_SQL_SCHEMA_PROBE_PG = """
+    SELECT t.table_name, c.column_name
+    FROM information_schema.tables t
+    LEFT JOIN information_schema.columns c
+        ON c.table_schema = t.table_schema AND c.table_name = t.table_name
+    WHERE t.table_name IN ('users', 'subscriptions')
+"""
+_SQL_SCHEMA_PROBE_SQLITE = """
+    SELECT m.name, p.name
+    FROM sqlite_master m
+    LEFT JOIN pragma_table_info(m.name) p
+    WHERE m.type = 'table' AND m.name IN ('users', 'subscriptions')
+"""
+
+
+_REQUIRED_USER_COLUMNS = ('replies_sent_monthly', 'replies_limit_monthly', 'replies_purchased',
+                          'replies_used_purchased', 'bot_paused')
+
+# {table: frozenset(columns)} for the verified tables, as read from the catalog. The
+# schema only changes on deploy (new workers), so it is read once per process.
+_schema_cache = None
+
+
+def _load_schema(cursor, is_postgres):
+    """Tables and their columns in one round-trip, cached for the life of the worker."""
+    global _schema_cache
+    if _schema_cache is None:
+        cursor.execute(_SQL_SCHEMA_PROBE_PG if is_postgres else _SQL_SCHEMA_PROBE_SQLITE)
+        schema = {}
+        for table, column in cursor.fetchall():
+            schema.setdefault(table, set()).add(column)
+        _schema_cache = {table: frozenset(columns) for table, columns in schema.items()}
+    return _schema_cache
+
+
+def _check_db_structure(cursor, is_postgres):
+    """Verification section 2: required tables and users columns. Returns (checks, all_ok)."""
     db_checks = []
     db_ok = True
-    
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Check if tables exist
-        if is_postgres():
-            cursor.execute("SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = 'users')")
-            users_exists = cursor.fetchone()[0]
-            cursor.execute("SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = 'subscriptions')")
-            subs_exists = cursor.fetchone()[0]
-        else:
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='users'")
-            users_exists = cursor.fetchone() is not None
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='subscriptions'")
-            subs_exists = cursor.fetchone() is not None
+        schema = _load_schema(cursor, is_postgres)
+        users_exists = 'users' in schema
+        subs_exists = 'subscriptions' in schema
         
-        db_checks.append(('✅' if users_exists else '❌', 'Users Table', 'Exists' if users_exists else 'Missing'))
-        db_checks.append(('✅' if subs_exists else '❌', 'Subscriptions Table', 'Exists' if subs_exists else 'Missing'))
+        db_checks.append(_kv('Users Table', users_exists, 'Exists'))
+        db_checks.append(_kv('Subscriptions Table', subs_exists, 'Exists'))
         
         if users_exists:
-            if is_postgres():
-                cursor.execute("SELECT column_name FROM information_schema.columns WHERE table_name = 'users'")
-                columns = [row[0] for row in cursor.fetchall()]
-            else:
-                cursor.execute("PRAGMA table_info(users)")
-                columns = [row[1] for row in cursor.fetchall()]
+            columns = schema['users']
             
-            required_columns = ['replies_sent_monthly', 'replies_limit_monthly', 'replies_purchased', 'replies_used_purchased', 'bot_paused']
-            for col in required_columns:
+            for col in _REQUIRED_USER_COLUMNS:
                 exists = col in columns
-                db_checks.append(('✅' if exists else '❌', f'Users.{col}', 'Exists' if exists else 'Missing'))
+                db_checks.append(_kv(f'Users.{col}', exists, 'Exists'))
                 if not exists:
                     db_ok = False
     except Exception as e:
         db_checks.append(('❌', 'Database Connection', f'Error: {str(e)[:50]}'))
         db_ok = False
-    finally:
-        if conn:
-            try:
-                conn.close()
-            except Exception:
-                pass
-    
-    checks['database_structure'] = {'checks': db_checks, 'all_ok': db_ok}
-    
-    # 3. Webhook Configuration
-    webhook_checks = []
-    webhook_url = f"{Config.BASE_URL}/webhook/stripe"
-    webhook_checks.append(('ℹ️', 'Webhook URL', webhook_url))
-    webhook_checks.append(('✅' if Config.STRIPE_WEBHOOK_SECRET else '❌', 'Webhook Secret', 'Set' if Config.STRIPE_WEBHOOK_SECRET else 'Missing'))
-    checks['webhook_config'] = {'checks': webhook_checks, 'all_ok': True}
-    
-    # 4. Reply Logic Verification
+        _rollback_quietly(cursor)
+    return db_checks, db_ok
+
+
+def _user_counters(cursor, user_id, placeholder):
+    """(sent, limit, purchased, used_purchased) for user_id, read once per request (memoized on g)."""
+    if getattr(g, '_user_counters', None) is not None and g._user_counters[0] == user_id:
+        return g._user_counters[1]
+    cursor.execute(f"""
+        SELECT replies_sent_monthly, replies_limit_monthly, replies_purchased, replies_used_purchased
+        FROM users WHERE id = {placeholder}
+    """, (user_id,))
+    row = cursor.fetchone()
+    counters = tuple(row) if row else None
+    g._user_counters = (user_id, counters)
+    return counters
+
+
+def _check_reply_logic(cursor, user_id, placeholder):
+    """Verification section 4: the current user's reply counters. Returns (checks, all_ok)."""
     reply_checks = []
     reply_ok = True
-    
-    conn = None
     try:
-        user_id = session['user_id']
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        placeholder = get_param_placeholder()
-        
-        cursor.execute(f"""
-            SELECT replies_sent_monthly, replies_limit_monthly, replies_purchased, replies_used_purchased
-            FROM users WHERE id = {placeholder}
-        """, (user_id,))
-        user_data = cursor.fetchone()
+        user_data = _user_counters(cursor, user_id, placeholder)
         
         if user_data:
             sent, limit, purchased, used_purchased = user_data
@@ -150,36 +176,22 @@ def payment_system_verification():
     except Exception as e:
         reply_checks.append(('❌', 'Reply Logic Check', f'Error: {str(e)[:50]}'))
         reply_ok = False
-    finally:
-        if conn:
-            try:
-                conn.close()
-            except Exception:
-                pass
-    
-    checks['reply_logic'] = {'checks': reply_checks, 'all_ok': reply_ok}
-    
-    # 5. Subscription Status
+        _rollback_quietly(cursor)
+    return reply_checks, reply_ok
+
+
+def _check_subscriptions(cursor, user_id, placeholder):
+    """Verification section 5: the current user's subscriptions (informational)."""
     sub_checks = []
-    
-    conn = None
     try:
-        user_id = session['user_id']
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        placeholder = get_param_placeholder()
-        
+        # Both counts in one pass (COUNT of a CASE is 0, not NULL, when there are no rows)
         cursor.execute(f"""
-            SELECT COUNT(*) FROM subscriptions 
-            WHERE user_id = {placeholder} AND status = 'active'
-        """, (user_id,))
-        active_count = cursor.fetchone()[0]
-        
-        cursor.execute(f"""
-            SELECT COUNT(*) FROM subscriptions 
-            WHERE user_id = {placeholder} AND status = 'canceled'
+            SELECT COUNT(CASE WHEN status = 'active' THEN 1 END),
+                   COUNT(CASE WHEN status = 'canceled' THEN 1 END)
+            FROM subscriptions 
+            WHERE user_id = {placeholder}
         """, (user_id,))
-        canceled_count = cursor.fetchone()[0]
+        active_count, canceled_count = cursor.fetchone()
         
         cursor.execute(f"""
             SELECT plan_type, status, stripe_subscription_id, created_at
@@ -203,32 +215,98 @@ def payment_system_verification():
             sub_checks.append(('ℹ️', 'Recent Subscriptions', 'None found'))
     except Exception as e:
         sub_checks.append(('❌', 'Subscription Check', f'Error: {str(e)[:50]}'))
+        _rollback_quietly(cursor)
+    return sub_checks
+
+
+@admin_bp.route("/payment-system-verification")
+@admin_required
+def payment_system_verification():
+    """Comprehensive payment system verification and checkup"""
+    from datetime import datetime
+    
+    checks = {
+        'stripe_config': {},
+        'database_structure': {},
+        'webhook_config': {},
+        'reply_logic': {},
+        'subscriptions': {},
+        'environment': {}
+    }
+    
+    # 1. Stripe Configuration Checks
+    stripe_checks = []
+    stripe_ok = True
+    
+    # The API probe runs in the background; its rows are prepended after the DB checks
+    stripe_probe = _executor.submit(_probe_stripe) if _stripe_client is not None else None
+    if stripe_probe is None:
+        stripe_checks.append(('❌', 'STRIPE_SECRET_KEY', 'Missing'))
+        stripe_ok = False
+    
+    stripe_checks.append(_kv('STRIPE_PUBLISHABLE_KEY', Config.STRIPE_PUBLISHABLE_KEY))
+    stripe_checks.append(_kv('STRIPE_WEBHOOK_SECRET', Config.STRIPE_WEBHOOK_SECRET))
+    
+    # Price IDs
+    env = _critical_env()
+    starter_price_id = Config.STRIPE_STARTER_PLAN_PRICE_ID or env['STRIPE_STARTER_PLAN_PRICE_ID']
+    standard_price_id = Config.STRIPE_STANDARD_PLAN_PRICE_ID or env['STRIPE_STANDARD_PLAN_PRICE_ID']
+    addon_price_id = Config.STRIPE_ADDON_PRICE_ID or env['STRIPE_ADDON_PRICE_ID']
+    
+    stripe_checks.append(_kv('Starter Plan Price ID', starter_price_id, f'{starter_price_id[:20]}...' if starter_price_id else None))
+    stripe_checks.append(_kv('Standard Plan Price ID', standard_price_id, f'{standard_price_id[:20]}...' if standard_price_id else None))
+    stripe_checks.append(_kv('Add-on Price ID', addon_price_id, f'{addon_price_id[:20]}...' if addon_price_id else None))
+    
+    # 2-5. Database checks share one connection (3 opens -> 1)
+    db_checks, db_ok = [], False
+    reply_checks, reply_ok = [], False
+    sub_checks = []
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        user_id = session['user_id']
+        placeholder = get_param_placeholder()
+        db_checks, db_ok = _check_db_structure(cursor, is_postgres())
+        reply_checks, reply_ok = _check_reply_logic(cursor, user_id, placeholder)
+        sub_checks = _check_subscriptions(cursor, user_id, placeholder)
+    except Exception as e:
+        error = f'Error: {str(e)[:50]}'
+        db_checks.append(('❌', 'Database Connection', error))
+        reply_checks.append(('❌', 'Reply Logic Check', error))
+        sub_checks.append(('❌', 'Subscription Check', error))
     finally:
         if conn:
             try:
                 conn.close()
             except Exception:
                 pass
-    
+
+    checks['database_structure'] = {'checks': db_checks, 'all_ok': db_ok}
+
+    if stripe_probe is not None:
+        probe_check, probe_ok = stripe_probe.result()
+        stripe_checks[:0] = [('✅', 'STRIPE_SECRET_KEY', 'Set'), probe_check]
+        stripe_ok = stripe_ok and probe_ok
+    checks['stripe_config'] = {'checks': stripe_checks, 'all_ok': stripe_ok}
+
+    # 3. Webhook Configuration
+    webhook_checks = []
+    webhook_url = f"{Config.BASE_URL}/webhook/stripe"
+    webhook_checks.append(('ℹ️', 'Webhook URL', webhook_url))
+    webhook_checks.append(_kv('Webhook Secret', Config.STRIPE_WEBHOOK_SECRET))
+    checks['webhook_config'] = {'checks': webhook_checks, 'all_ok': True}
+
+    checks['reply_logic'] = {'checks': reply_checks, 'all_ok': reply_ok}
     checks['subscriptions'] = {'checks': sub_checks, 'all_ok': True}
     
     # 6. Environment Variables Summary
     env_checks = []
     env_ok = True
     
-    critical_vars = [
-        'STRIPE_SECRET_KEY',
-        'STRIPE_PUBLISHABLE_KEY',
-        'STRIPE_WEBHOOK_SECRET',
-        'STRIPE_STARTER_PLAN_PRICE_ID',
-        'STRIPE_STANDARD_PLAN_PRICE_ID',
-        'STRIPE_ADDON_PRICE_ID'
-    ]
-    
-    for var in critical_vars:
-        value = os.getenv(var)
+    for var, value in env.items():
         exists = value is not None and value != ''
-        env_checks.append(('✅' if exists else '❌', var, 'Set' if exists else 'Missing'))
+        env_checks.append(_kv(var, exists))
         if not exists:
             env_ok = False
     
@@ -242,135 +320,16 @@ def payment_system_verification():
         checks['environment']['all_ok']
     ])
     
-    # Generate HTML
-    html = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Payment System Verification</title>
-        <style>
-            body {{
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, Cantarell, sans-serif;
-                background: #0a0a0a;
-                color: #fff;
-                padding: 20px;
-                line-height: 1.6;
-            }}
-            .container {{
-                max-width: 1200px;
-                margin: 0 auto;
-            }}
-            h1 {{
-                color: #4a90e2;
-                border-bottom: 2px solid #4a90e2;
-                padding-bottom: 10px;
-            }}
-            .section {{
-                background: rgba(255, 255, 255, 0.05);
-                border: 1px solid rgba(255, 255, 255, 0.1);
-                border-radius: 8px;
-                padding: 20px;
-                margin: 20px 0;
-            }}
-            .section h2 {{
-                color: #51cf66;
-                margin-top: 0;
-            }}
-            .check-item {{
-                display: flex;
-                align-items: center;
-                padding: 8px;
-                margin: 5px 0;
-                background: rgba(255, 255, 255, 0.02);
-                border-radius: 4px;
-            }}
-            .check-item span:first-child {{
-                font-size: 20px;
-                margin-right: 10px;
-                width: 30px;
-            }}
-            .status-badge {{
-                display: inline-block;
-                padding: 10px 20px;
-                border-radius: 5px;
-                font-weight: bold;
-                margin: 20px 0;
-            }}
-            .status-ok {{
-                background: #51cf66;
-                color: #000;
-            }}
-            .status-error {{
-                background: #ff6b6b;
-                color: #fff;
-            }}
-            .back-link {{
-                display: inline-block;
-                margin-top: 20px;
-                padding: 10px 20px;
-                background: #4a90e2;
-                color: #fff;
-                text-decoration: none;
-                border-radius: 5px;
-            }}
-            .back-link:hover {{
-                background: #357abd;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h1>💰 Payment System Verification</h1>
-            <div class="status-badge {'status-ok' if overall_ok else 'status-error'}">
-                {'✅ All Systems Operational' if overall_ok else '❌ Issues Detected'}
-            </div>
-            
-            <div class="section">
-                <h2>1. Stripe Configuration</h2>
-                {'<p style="color: #51cf66;">✅ All Stripe configuration is correct.</p>' if checks['stripe_config']['all_ok'] else '<p style="color: #ff6b6b;">❌ Some Stripe configuration is missing or incorrect.</p>'}
-                {'<br>'.join([f'<div class="check-item"><span>{icon}</span><span><strong>{name}:</strong> {status}</span></div>' for icon, name, status in checks['stripe_config']['checks']])}
-            </div>
-            
-            <div class="section">
-                <h2>2. Database Structure</h2>
-                {'<p style="color: #51cf66;">✅ Database structure is correct.</p>' if checks['database_structure']['all_ok'] else '<p style="color: #ff6b6b;">❌ Database structure issues detected.</p>'}
-                {'<br>'.join([f'<div class="check-item"><span>{icon}</span><span><strong>{name}:</strong> {status}</span></div>' for icon, name, status in checks['database_structure']['checks']])}
-            </div>
-            
-            <div class="section">
-                <h2>3. Webhook Configuration</h2>
-                {'<br>'.join([f'<div class="check-item"><span>{icon}</span><span><strong>{name}:</strong> {status}</span></div>' for icon, name, status in checks['webhook_config']['checks']])}
-            </div>
-            
-            <div class="section">
-                <h2>4. Reply Counting Logic</h2>
-                {'<p style="color: #51cf66;">✅ Reply counting logic is working correctly.</p>' if checks['reply_logic']['all_ok'] else '<p style="color: #ff6b6b;">❌ Reply counting logic has issues.</p>'}
-                {'<br>'.join([f'<div class="check-item"><span>{icon}</span><span><strong>{name}:</strong> {status}</span></div>' for icon, name, status in checks['reply_logic']['checks']])}
-            </div>
-            
-            <div class="section">
-                <h2>5. Subscription Status</h2>
-                {'<br>'.join([f'<div class="check-item"><span>{icon}</span><span><strong>{name}:</strong> {status}</span></div>' for icon, name, status in checks['subscriptions']['checks']])}
-            </div>
-            
-            <div class="section">
-                <h2>6. Environment Variables</h2>
-                {'<p style="color: #51cf66;">✅ All critical environment variables are set.</p>' if checks['environment']['all_ok'] else '<p style="color: #ff6b6b;">❌ Some environment variables are missing.</p>'}
-                {'<br>'.join([f'<div class="check-item"><span>{icon}</span><span><strong>{name}:</strong> {status}</span></div>' for icon, name, status in checks['environment']['checks']])}
-            </div>
-            
-            <a href="/dashboard" class="back-link">← Back to Dashboard</a>
-        </div>
-    </body>
-    </html>
-    """
-    
-    return html
+    return render_template('payment_system_verification.html', checks=checks, overall_ok=overall_ok)
 
 
 
 CONFIRM_CLEAN_ALL_TEXT = "DELETE ALL"
 
+# Tables emptied before users, in foreign-key order
+CLEAN_ALL_TABLES = ('activity_logs', 'purchases', 'subscriptions', 'messages',
+                    'client_settings', 'instagram_connections', 'password_resets', 'usage_logs')
+
 
 @admin_bp.route("/admin/clean-all-users", methods=["POST"])
 @admin_required
@@ -389,21 +348,30 @@ def clean_all_users():
         
         cursor = conn.cursor()
         
-        # Delete in order to respect foreign key constraints
-        for table in ['activity_logs', 'purchases', 'subscriptions', 'messages',
-                      'client_settings', 'instagram_connections', 'password_resets', 'usage_logs']:
-            try:
-                cursor.execute(f"DELETE FROM {table}")
-                logger.info(f"Deleted all {table}")
-            except Exception as e:
-                logger.warning(f"Could not delete {table}: {e}")
-        
-        # Finally, delete all users
-        cursor.execute("DELETE FROM users")
-        deleted_count = cursor.rowcount
+        if is_postgres():
+            # One statement: TRUNCATE skips per-row WAL/triggers, and CASCADE also empties
+            # any other table that references these (e.g. conversation_senders).
+            # Identities are not restarted so old session cookies can't map onto new users.
+            cursor.execute("SELECT COUNT(*) FROM users")
+            deleted_count = cursor.fetchone()[0]
+            cursor.execute(f"TRUNCATE {', '.join(CLEAN_ALL_TABLES)}, users CASCADE")
+            logger.info(f"Truncated {', '.join(CLEAN_ALL_TABLES)}, users")
+        else:
+            # One script, one transaction, deleting in order to respect foreign key
+            # constraints. A failing DELETE aborts the script and the open transaction
+            # is discarded when the connection closes.
+            cursor.execute("SELECT COUNT(*) FROM users")
+            deleted_count = cursor.fetchone()[0]
+            conn.executescript(
+                "BEGIN; "
+                + "".join(f"DELETE FROM {table}; " for table in CLEAN_ALL_TABLES)
+                + "DELETE FROM users; COMMIT;"
+            )
+            logger.info(f"Deleted all rows from {', '.join(CLEAN_ALL_TABLES)}, users")
         logger.info(f"Deleted {deleted_count} users")
         
         conn.commit()
+        users_cache.invalidate()
         
         flash(f"Successfully cleaned database. Deleted {deleted_count} users and all related data.", "success")
         return redirect(url_for('admin.admin_dashboard'))
@@ -421,6 +389,31 @@ def clean_all_users():
                 pass
 
 
+# Dashboard tables page through at most this many of the newest rows
+_DASHBOARD_MAX_ROWS = 50
+
+
+def _page_limit(per_page, offset):
+    """LIMIT for a page of the newest _DASHBOARD_MAX_ROWS rows (0 past the cap)."""
+    return max(0, min(per_page, _DASHBOARD_MAX_ROWS - offset))
+
+
+def _fetch_all(sql, params):
+    """Run one read on its own pooled connection (called from _executor threads).
+
+    Rows come back addressable by column name, so they go to the template as-is.
+    """
+    conn = get_db_connection(readonly=True)
+    if not conn:
+        raise RuntimeError("Database connection unavailable")
+    try:
+        cursor = named_cursor(conn)
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    finally:
+        conn.close()
+
+
 @admin_bp.route("/admin/chata-internal-dashboard-2024-secure")
 @admin_required
 def admin_dashboard():
@@ -433,30 +426,28 @@ def admin_dashboard():
     users_per_page = 10
     logs_per_page = 10
     
-    conn = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
         placeholder = get_param_placeholder()
         
-        # Get total users count
-        cursor.execute("SELECT COUNT(*) FROM users")
-        total_users = cursor.fetchone()[0]
-        
-        # Get users with active subscriptions
-        cursor.execute("""
-            SELECT COUNT(DISTINCT user_id) 
-            FROM subscriptions 
-            WHERE status = 'active'
-        """)
-        active_subscribers = cursor.fetchone()[0]
-        
-        # Get users with pagination (limit to 50 total, show 10 per page)
-        total_users_to_show = min(50, total_users)
+        # Pages are capped at 50 rows total, so each page's LIMIT/OFFSET is known without
+        # the counts and every query below is independent: run them concurrently, each on
+        # its own pooled connection, so the page costs the slowest query, not the sum.
         users_offset = (users_page - 1) * users_per_page
-        
-        if is_postgres():
-            cursor.execute("""
+        logs_offset = (logs_page - 1) * logs_per_page
+        queries = {
+            # Stat-card totals and the activity log count in one round-trip.
+            # Only min(50, logs) is ever shown, so the log count stops after 50 rows instead of
+            # scanning an ever-growing table.
+            'counts': (f"""
+                SELECT
+                    (SELECT COUNT(*) FROM users) AS total_users,
+                    (SELECT COUNT(DISTINCT user_id) FROM subscriptions WHERE status = 'active') AS active_subscribers,
+                    (SELECT COUNT(*) FROM subscriptions) AS total_subscriptions,
+                    (SELECT COUNT(*) FROM instagram_connections) AS total_connections,
+                    (SELECT COUNT(*) FROM (SELECT 1 FROM activity_logs LIMIT {_DASHBOARD_MAX_ROWS}) AS capped) AS total_logs
+            """, ()),
+            # Get users with pagination (limit to 50 total, show 10 per page)
+            'users': (f"""
                 SELECT 
                     id, username, email, 
                     replies_sent_monthly, 
@@ -467,160 +458,67 @@ def admin_dashboard():
                     created_at
                 FROM users
                 ORDER BY created_at DESC
-                LIMIT %s OFFSET %s
-            """, (min(users_per_page, total_users_to_show - users_offset), users_offset))
-        else:
-            cursor.execute("""
+                LIMIT {placeholder} OFFSET {placeholder}
+            """, (_page_limit(users_per_page, users_offset), users_offset)),
+            # Get the most recently updated subscriptions
+            'subscriptions': (f"""
                 SELECT 
-                    id, username, email, 
-                    replies_sent_monthly, 
-                    replies_limit_monthly, 
-                    replies_purchased, 
-                    replies_used_purchased,
-                    bot_paused,
-                    created_at
-                FROM users
-                ORDER BY created_at DESC
-                LIMIT ? OFFSET ?
-            """, (min(users_per_page, total_users_to_show - users_offset), users_offset))
-        users_data = cursor.fetchall()
-        
-        # Calculate users pagination
-        total_users_pages = (total_users_to_show + users_per_page - 1) // users_per_page
-        
-        # Get all subscriptions
-        cursor.execute("""
-            SELECT 
-                id, user_id, stripe_subscription_id, stripe_customer_id,
-                plan_type, status, 
-                current_period_start, current_period_end,
-                created_at, updated_at
-            FROM subscriptions
-            ORDER BY updated_at DESC
-        """)
-        subscriptions_data = cursor.fetchall()
-        
-        # Get Instagram connections
-        cursor.execute("""
-            SELECT 
-                id, user_id, instagram_user_id, instagram_page_id,
-                is_active, created_at
-            FROM instagram_connections
-            ORDER BY created_at DESC
-        """)
-        connections_data = cursor.fetchall()
-        
-        # Get recent purchases
-        cursor.execute("""
-            SELECT 
-                id, user_id, amount_paid, replies_added,
-                payment_provider, payment_id, status, created_at
-            FROM purchases
-            ORDER BY created_at DESC
-            LIMIT 50
-        """)
-        purchases_data = cursor.fetchall()
-        
-        # Get activity logs with pagination (limit to 50 total, show 10 per page)
-        cursor.execute("SELECT COUNT(*) FROM activity_logs")
-        total_logs = cursor.fetchone()[0]
-        total_logs_to_show = min(50, total_logs)
-        logs_offset = (logs_page - 1) * logs_per_page
-        
-        if is_postgres():
-            cursor.execute("""
+                    id, user_id, stripe_subscription_id, stripe_customer_id,
+                    plan_type, status, 
+                    current_period_start, current_period_end,
+                    created_at, updated_at
+                FROM subscriptions
+                ORDER BY updated_at DESC, id DESC
+                LIMIT {_DASHBOARD_MAX_ROWS}
+            """, ()),
+            # Get the newest Instagram connections
+            'connections': (f"""
                 SELECT 
-                    id, user_id, action, details, ip_address, created_at
-                FROM activity_logs
-                ORDER BY created_at DESC
-                LIMIT %s OFFSET %s
-            """, (min(logs_per_page, total_logs_to_show - logs_offset), logs_offset))
-        else:
-            cursor.execute("""
+                    id, user_id, instagram_user_id, instagram_page_id,
+                    is_active, created_at
+                FROM instagram_connections
+                ORDER BY created_at DESC, id DESC
+                LIMIT {_DASHBOARD_MAX_ROWS}
+            """, ()),
+            # Get recent purchases
+            'purchases': (f"""
+                SELECT 
+                    id, user_id, amount_paid, replies_added,
+                    payment_provider, payment_id, status, created_at
+                FROM purchases
+                ORDER BY created_at DESC, id DESC
+                LIMIT {_DASHBOARD_MAX_ROWS}
+            """, ()),
+            # Get activity logs with pagination (limit to 50 total, show 10 per page)
+            'activity_logs': (f"""
                 SELECT 
                     id, user_id, action, details, ip_address, created_at
                 FROM activity_logs
                 ORDER BY created_at DESC
-                LIMIT ? OFFSET ?
-            """, (min(logs_per_page, total_logs_to_show - logs_offset), logs_offset))
-        activity_logs = cursor.fetchall()
-        
-        # Calculate logs pagination
-        total_logs_pages = (total_logs_to_show + logs_per_page - 1) // logs_per_page
-        
-        # Format data for template (DB data already fetched, conn will be closed in finally)
-        users = []
-        for row in users_data:
-            users.append({
-                'id': row[0],
-                'username': row[1],
-                'email': row[2],
-                'replies_sent_monthly': row[3],
-                'replies_limit_monthly': row[4],
-                'replies_purchased': row[5],
-                'replies_used_purchased': row[6],
-                'bot_paused': row[7],
-                'created_at': row[8]
-            })
+                LIMIT {placeholder} OFFSET {placeholder}
+            """, (_page_limit(logs_per_page, logs_offset), logs_offset)),
+        }
+        futures = {name: _executor.submit(_fetch_all, sql, params) for name, (sql, params) in queries.items()}
+        results = {name: future.result() for name, future in futures.items()}
         
-        subscriptions = []
-        for row in subscriptions_data:
-            subscriptions.append({
-                'id': row[0],
-                'user_id': row[1],
-                'stripe_subscription_id': row[2],
-                'stripe_customer_id': row[3],
-                'plan_type': row[4],
-                'status': row[5],
-                'current_period_start': row[6],
-                'current_period_end': row[7],
-                'created_at': row[8],
-                'updated_at': row[9]
-            })
+        (total_users, active_subscribers, total_subscriptions, total_connections, total_logs), = results['counts']
         
-        connections = []
-        for row in connections_data:
-            connections.append({
-                'id': row[0],
-                'user_id': row[1],
-                'instagram_user_id': row[2],
-                'instagram_page_id': row[3],
-                'is_active': row[4],
-                'created_at': row[5]
-            })
-        
-        purchases = []
-        for row in purchases_data:
-            purchases.append({
-                'id': row[0],
-                'user_id': row[1],
-                'amount_paid': row[2],
-                'replies_added': row[3],
-                'payment_provider': row[4],
-                'payment_id': row[5],
-                'status': row[6],
-                'created_at': row[7]
-            })
-        
-        logs = []
-        for row in activity_logs:
-            logs.append({
-                'id': row[0],
-                'user_id': row[1],
-                'action': row[2],
-                'details': row[3],
-                'ip_address': row[4],
-                'created_at': row[5]
-            })
+        # Calculate pagination
+        total_users_to_show = min(_DASHBOARD_MAX_ROWS, total_users)
+        total_users_pages = (total_users_to_show + users_per_page - 1) // users_per_page
+        total_logs_to_show = min(_DASHBOARD_MAX_ROWS, total_logs)
+        total_logs_pages = (total_logs_to_show + logs_per_page - 1) // logs_per_page
         
         return render_template('admin_dashboard.html',
                              total_users=total_users,
                              active_subscribers=active_subscribers,
-                             users=users,
-                             subscriptions=subscriptions,
-                             connections=connections,
-                             purchases=purchases,
-                             activity_logs=logs,
+                             total_subscriptions=total_subscriptions,
+                             total_connections=total_connections,
+                             users=results['users'],
+                             subscriptions=results['subscriptions'],
+                             connections=results['connections'],
+                             purchases=results['purchases'],
+                             activity_logs=results['activity_logs'],
                              users_page=users_page,
                              total_users_pages=total_users_pages,
                              logs_page=logs_page,
@@ -631,11 +529,5 @@ def admin_dashboard():
         logger.error(f"Admin dashboard error: {e}")
         logger.error(traceback.format_exc())
         return "Error loading admin dashboard. Please check logs.", 500
-    finally:
-        if conn:
-            try:
-                conn.close()
-            except Exception:
-                pass
 
 
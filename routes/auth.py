@@ -2,16 +2,19 @@
 import logging
 import secrets
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 
 from flask import Blueprint, request, render_template, redirect, url_for, flash, session, jsonify
 
 logger = logging.getLogger("chata.routes.auth")
 import requests as http_requests
+from requests.adapters import HTTPAdapter
 from werkzeug.security import check_password_hash, generate_password_hash
 
 from config import Config
 from database import get_db_connection, get_param_placeholder
-from services.auth import login_required, create_reset_token, verify_reset_token, mark_reset_token_used
+from services.auth import login_required, rotate_session_id, create_reset_token, verify_reset_token, mark_reset_token_used
+from services import users_cache
 from services.users import get_user_by_email, get_user_by_username_or_email, get_user_by_username, create_user, get_user_by_id
 from services.email import send_reset_email, send_welcome_email
 from services.activity import log_activity
@@ -19,13 +22,22 @@ from services.instagram import discover_instagram_user_id
 
 auth_bp = Blueprint('auth', __name__)
 
-from extensions import limiter
+# Graph API calls in the Instagram OAuth callback reuse one keep-alive session (no
+# TLS handshake per call); independent calls run side by side on _graph_executor.
+_GRAPH_TIMEOUT_SECONDS = 10
+_graph_session = http_requests.Session()
+_graph_session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=20))
+_graph_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="graph")
+
+from extensions import (
+    limiter, LIMIT_SIGNUP, LIMIT_LOGIN, LIMIT_FORGOT_PASSWORD, LIMIT_RESET_PASSWORD, LIMIT_OAUTH_CALLBACK,
+)
 
 
 # ── signup ────────────────────────────────────────────────────────────────
 
 @auth_bp.route("/signup", methods=["GET", "POST"])
-@limiter.limit("10 per 5 minutes")  # Rate limit: 10 signup attempts per 5 minutes per IP
+@limiter.limit(LIMIT_SIGNUP)
 def signup():
     if request.method == "POST":
         username = request.form.get("username", "").strip()
@@ -71,6 +83,7 @@ def signup():
         try:
             user_id = create_user(username, email, password)
             session['user_id'] = user_id
+            rotate_session_id()
             
             # Get user data for welcome message
             user = get_user_by_id(user_id)
@@ -100,9 +113,12 @@ def signup():
 
 _MAX_FAILED_LOGINS = 7
 _LOCKOUT_MINUTES = 15
+# Verified against when the account doesn't exist, so "no such user" costs the same
+# hash work as "wrong password" and response time doesn't reveal which accounts exist.
+_DUMMY_PASSWORD_HASH = generate_password_hash(secrets.token_urlsafe(16))
 
 @auth_bp.route("/login", methods=["GET", "POST"])
-@limiter.limit("10 per minute")
+@limiter.limit(LIMIT_LOGIN)
 def login():
     if request.method == "POST":
         username_or_email = request.form.get("username_or_email", "").strip()
@@ -113,15 +129,36 @@ def login():
             return render_template("login.html")
 
         try:
+            # The (cached) lookup only resolves the account; the password hash is always
+            # read fresh by primary key, so a reset or deletion on any worker takes
+            # effect immediately.
             user = get_user_by_username_or_email(username_or_email)
+            password_hash = None
 
-            # Account lockout check
             if user:
                 conn = get_db_connection()
-                if conn:
+                try:
+                    if not conn:
+                        raise RuntimeError("Database connection failed")
+                    cursor = conn.cursor()
+                    ph = get_param_placeholder()
+                    cursor.execute(f"SELECT password_hash FROM users WHERE id = {ph}", (user['id'],))
+                    hash_row = cursor.fetchone()
+                except Exception as e:
+                    # Not a wrong password: say so instead of rejecting a correct one
+                    logger.error(f"Credential lookup failed for user {user['id']}: {e}")
+                    if conn:
+                        conn.close()
+                    flash("We couldn't verify your credentials right now. Please try again in a moment.", "error")
+                    return render_template("login.html")
+                if hash_row:
+                    password_hash = hash_row[0]
+                else:
+                    user = None  # deleted since it was cached
+
+                # Account lockout check
+                if user:
                     try:
-                        cursor = conn.cursor()
-                        ph = get_param_placeholder()
                         cursor.execute(
                             f"SELECT failed_login_attempts, locked_until FROM users WHERE id = {ph}",
                             (user['id'],))
@@ -137,8 +174,16 @@ def login():
                         logger.warning(f"Lockout check failed: {e}")
                     finally:
                         conn.close()
+                else:
+                    conn.close()
+
+            if password_hash is not None:
+                password_ok = check_password_hash(password_hash, password)
+            else:
+                check_password_hash(_DUMMY_PASSWORD_HASH, password)
+                password_ok = False
 
-            if user and check_password_hash(user['password_hash'], password):
+            if password_ok:
                 # Reset lockout on success
                 conn = get_db_connection()
                 if conn:
@@ -157,6 +202,7 @@ def login():
                 session.clear()
                 session['user_id'] = user['id']
                 session.permanent = True
+                rotate_session_id()
                 log_activity(user['id'], 'login', 'User logged in successfully')
                 flash(f"Welcome back, {user['username']}!", "success")
                 return redirect(url_for('dashboard_bp.dashboard'))
@@ -196,7 +242,7 @@ def login():
 # ── forgot password ───────────────────────────────────────────────────────
 
 @auth_bp.route("/forgot-password", methods=["GET", "POST"])
-@limiter.limit("5 per 15 minutes")  # Rate limit: 5 forgot-password attempts per 15 minutes per IP
+@limiter.limit(LIMIT_FORGOT_PASSWORD)
 def forgot_password():
     try:
         if request.method == "POST":
@@ -240,7 +286,7 @@ def forgot_password():
 # ── reset password ────────────────────────────────────────────────────────
 
 @auth_bp.route("/reset-password", methods=["GET", "POST"])
-@limiter.limit("10 per 15 minutes")  # Rate limit: 10 reset-password attempts per 15 minutes per IP
+@limiter.limit(LIMIT_RESET_PASSWORD)
 def reset_password():
     token = request.args.get("token")
     
@@ -282,6 +328,7 @@ def reset_password():
             placeholder = get_param_placeholder()
             cursor.execute(f"UPDATE users SET password_hash = {placeholder} WHERE id = {placeholder}", (password_hash, user_id))
             conn.commit()
+            users_cache.invalidate(user_id)
             
             # Mark token as used
             mark_reset_token_used(token)
@@ -344,7 +391,7 @@ def instagram_auth():
 
 @auth_bp.route("/auth/instagram/callback")
 @login_required
-@limiter.limit("20 per hour")  # Rate limit: 20 OAuth callbacks per hour per IP
+@limiter.limit(LIMIT_OAUTH_CALLBACK)
 def instagram_callback():
     """Handle Instagram OAuth callback"""
     code = request.args.get('code')
@@ -378,7 +425,7 @@ def instagram_callback():
             'code': code
         }
         
-        response = http_requests.post(token_url, data=token_data)
+        response = _graph_session.post(token_url, data=token_data, timeout=_GRAPH_TIMEOUT_SECONDS)
         response.raise_for_status()
         token_info = response.json()
         
@@ -395,13 +442,9 @@ def instagram_callback():
             'input_token': access_token,
             'access_token': Config.FACEBOOK_APP_ID + '|' + Config.FACEBOOK_APP_SECRET
         }
-        debug_response = http_requests.get(debug_token_url, params=debug_params)
-        if debug_response.status_code == 200:
-            debug_data = debug_response.json()
-            scopes = debug_data.get('data', {}).get('scopes', [])
-            granular = debug_data.get('data', {}).get('granular_scopes', [])
-            logger.info(f"Token scopes: {scopes}; granular_scopes count: {len(granular)}")
-            logger.debug(f"Token debug response: {debug_data}")
+        # Independent of /me/accounts below: fetch both at once
+        debug_future = _graph_executor.submit(
+            _graph_session.get, debug_token_url, params=debug_params, timeout=_GRAPH_TIMEOUT_SECONDS)
         
         # 1) Get Pages the user manages (requires pages_show_list). Include access_token to get page token in one call.
         accounts_url = "https://graph.facebook.com/v18.0/me/accounts"
@@ -412,9 +455,17 @@ def instagram_callback():
         
         logger.debug(f"Fetching accounts from: {accounts_url}")
         
-        accounts_response = http_requests.get(accounts_url, params=accounts_params)
+        accounts_response = _graph_session.get(accounts_url, params=accounts_params, timeout=_GRAPH_TIMEOUT_SECONDS)
         logger.debug(f"Response status: {accounts_response.status_code}")
         
+        debug_response = debug_future.result()
+        if debug_response.status_code == 200:
+            debug_data = debug_response.json()
+            scopes = debug_data.get('data', {}).get('scopes', [])
+            granular = debug_data.get('data', {}).get('granular_scopes', [])
+            logger.info(f"Token scopes: {scopes}; granular_scopes count: {len(granular)}")
+            logger.debug(f"Token debug response: {debug_data}")
+        
         if accounts_response.status_code != 200:
             logger.error(f"API Error: {accounts_response.text}")
             flash(f"Facebook API error: {accounts_response.status_code}", "error")
@@ -474,7 +525,7 @@ def instagram_callback():
                 logger.debug(f"Fetching Page info from: {page_url}")
                 logger.debug(f"With params: {page_params}")
                 
-                page_response = http_requests.get(page_url, params=page_params)
+                page_response = _graph_session.get(page_url, params=page_params, timeout=_GRAPH_TIMEOUT_SECONDS)
                 logger.debug(f"Page response status: {page_response.status_code}")
                 page_data = page_response.json()
                 logger.debug(f"Page response: {page_data}")
@@ -496,7 +547,8 @@ def instagram_callback():
             accounts_params_full = {
                 'access_token': access_token
             }
-            accounts_response_full = http_requests.get(accounts_url_full, params=accounts_params_full)
+            accounts_response_full = _graph_session.get(accounts_url_full, params=accounts_params_full,
+                                                        timeout=_GRAPH_TIMEOUT_SECONDS)
             if accounts_response_full.status_code == 200:
                 accounts_data_full = accounts_response_full.json()
                 for account in accounts_data_full.get('data', []):
@@ -519,7 +571,8 @@ def instagram_callback():
                 'access_token': access_token
             }
             logger.debug(f"Getting Page Access Token from: {page_access_token_url}")
-            page_token_response = http_requests.get(page_access_token_url, params=page_token_params)
+            page_token_response = _graph_session.get(page_access_token_url, params=page_token_params,
+                                                     timeout=_GRAPH_TIMEOUT_SECONDS)
             logger.debug(f"Page token response status: {page_token_response.status_code}")
             
             if page_token_response.status_code != 200:
@@ -539,13 +592,9 @@ def instagram_callback():
         subscribed_fields = "messages,messaging_postbacks,message_deliveries,message_reads"
         subscribe_url = f"https://graph.facebook.com/v18.0/{page_id}/subscribed_apps"
         subscribe_params = {'access_token': page_access_token, 'subscribed_fields': subscribed_fields}
-        subscribe_response = http_requests.post(subscribe_url, data=subscribe_params)
-        webhook_subscribed = subscribe_response.status_code == 200
-        if webhook_subscribed:
-            sub_result = subscribe_response.json()
-            logger.info(f"Webhook subscribed_apps for page {page_id}: {sub_result.get('success', False)}")
-        else:
-            logger.warning(f"Webhook subscribed_apps failed for page {page_id}: {subscribe_response.status_code} {subscribe_response.text}")
+        # Independent of the profile lookup below: run both at once
+        subscribe_future = _graph_executor.submit(
+            _graph_session.post, subscribe_url, data=subscribe_params, timeout=_GRAPH_TIMEOUT_SECONDS)
         
         # 4) Get Instagram profile using the Page Access Token
         profile_url = f"https://graph.facebook.com/v18.0/{instagram_user_id}"
@@ -557,9 +606,17 @@ def instagram_callback():
         logger.debug(f"Getting Instagram profile from: {profile_url}")
         logger.debug("Using Page Access Token for profile request")
         
-        profile_response = http_requests.get(profile_url, params=profile_params)
+        profile_response = _graph_session.get(profile_url, params=profile_params, timeout=_GRAPH_TIMEOUT_SECONDS)
         logger.debug(f"Profile response status: {profile_response.status_code}")
         
+        subscribe_response = subscribe_future.result()
+        webhook_subscribed = subscribe_response.status_code == 200
+        if webhook_subscribed:
+            sub_result = subscribe_response.json()
+            logger.info(f"Webhook subscribed_apps for page {page_id}: {sub_result.get('success', False)}")
+        else:
+            logger.warning(f"Webhook subscribed_apps failed for page {page_id}: {subscribe_response.status_code} {subscribe_response.text}")
+        
         if profile_response.status_code != 200:
             logger.error(f"Failed to get Instagram profile: {profile_response.text}")
             flash("Failed to get Instagram profile details. Please try again.", "error")
@@ -575,73 +632,44 @@ def instagram_callback():
                 cursor = conn.cursor()
                 param = get_param_placeholder()
                 
-                # Check if connection already exists for this user
-                cursor.execute(f"SELECT id FROM instagram_connections WHERE user_id = {param} AND instagram_user_id = {param}", 
-                              (session['user_id'], instagram_user_id))
-                existing = cursor.fetchone()
-                
-                # CRITICAL: Check if this Instagram account is already actively connected to a DIFFERENT user
-                # If yes, block the connection - one Instagram account can only be connected to one email at a time
+                # All pre-checks in one round-trip:
+                # - existing_id: this user's connection to this account, if any (reconnect vs. new)
+                # - connected_elsewhere: the account is actively connected to a DIFFERENT user.
+                #   One Instagram account can only be connected to one email at a time.
+                # - has_received_free_trial: persistent per-user flag that survives disconnection;
+                #   each email account only gets the free trial ONCE
+                # - instagram_ever_connected: the account was EVER connected (including disconnected
+                #   ones) to any email, which uses up its free trial eligibility
                 cursor.execute(f"""
-                    SELECT id, user_id 
-                    FROM instagram_connections 
-                    WHERE instagram_user_id = {param} 
-                    AND user_id != {param}
-                    AND is_active = TRUE
-                    LIMIT 1
-                """, (instagram_user_id, session['user_id']))
-                active_connection_other_user = cursor.fetchone()
+                    SELECT
+                        (SELECT id FROM instagram_connections
+                         WHERE user_id = {param} AND instagram_user_id = {param} LIMIT 1),
+                        EXISTS (SELECT 1 FROM instagram_connections
+                                WHERE instagram_user_id = {param} AND user_id != {param} AND is_active = TRUE),
+                        (SELECT has_received_free_trial FROM users WHERE id = {param}),
+                        EXISTS (SELECT 1 FROM instagram_connections WHERE instagram_user_id = {param})
+                """, (session['user_id'], instagram_user_id, instagram_user_id, session['user_id'],
+                      session['user_id'], instagram_user_id))
+                existing_id, connected_elsewhere, has_received_free_trial, instagram_ever_connected = cursor.fetchone()
+                has_received_free_trial = bool(has_received_free_trial)
                 
-                if active_connection_other_user:
+                if connected_elsewhere:
                     # This Instagram account is already connected to another email account
                     flash("This Instagram account is already connected to another email account. Please disconnect it from the other account first.", "error")
                     return redirect(url_for('dashboard_bp.dashboard'))
                 
-                # Check if this user has already received the free trial (persistent flag that survives disconnection)
-                # Each email account only gets the free trial ONCE, on their first Instagram connection
-                cursor.execute(f"""
-                    SELECT has_received_free_trial 
-                    FROM users 
-                    WHERE id = {param}
-                """, (session['user_id'],))
-                user_result = cursor.fetchone()
-                has_received_free_trial = user_result[0] if user_result and user_result[0] else False
-                
-                # CRITICAL: Check if this Instagram account has EVER been connected before (including disconnected ones)
-                # If an Instagram account was previously connected to any email, it has "used up" its free trial eligibility
-                # Even if disconnected, connecting it to a new email should NOT grant free trial
-                cursor.execute(f"""
-                    SELECT id, user_id 
-                    FROM instagram_connections 
-                    WHERE instagram_user_id = {param}
-                    ORDER BY created_at ASC 
-                    LIMIT 1
-                """, (instagram_user_id,))
-                instagram_ever_connected = cursor.fetchone()
-                
-                # Check if this specific user has ever connected this specific account before
-                cursor.execute(f"""
-                    SELECT id 
-                    FROM instagram_connections 
-                    WHERE instagram_user_id = {param} 
-                    AND user_id = {param}
-                    LIMIT 1
-                """, (instagram_user_id, session['user_id']))
-                user_previous_connection = cursor.fetchone()
-                
                 # Determine if free trial should be granted:
                 # 1. User must NOT have received free trial before
                 # 2. Instagram account must NEVER have been connected before (by any user)
                 should_grant_free_trial = not has_received_free_trial and not instagram_ever_connected
                 
                 logger.debug(f"Instagram connection check for account {instagram_user_id}:")
-                logger.debug(f"   - Existing connection for this user: {existing is not None}")
+                logger.debug(f"   - Existing connection for this user: {existing_id is not None}")
                 logger.debug(f"   - User has received free trial: {has_received_free_trial}")
-                logger.debug(f"   - Instagram account ever connected: {instagram_ever_connected is not None}")
-                logger.debug(f"   - User previously connected this account: {user_previous_connection is not None}")
+                logger.debug(f"   - Instagram account ever connected: {bool(instagram_ever_connected)}")
                 logger.debug(f"   - Should grant free trial: {should_grant_free_trial}")
                 
-                if existing:
+                if existing_id is not None:
                     # Update existing connection (reconnection of same account by same user)
                     cursor.execute(f"""
                         UPDATE instagram_connections 
@@ -652,7 +680,7 @@ def instagram_callback():
                             webhook_subscription_active = {param},
                             updated_at = CURRENT_TIMESTAMP
                         WHERE id = {param}
-                    """, (page_access_token, profile_data.get('username'), page_name, webhook_subscribed, existing[0]))
+                    """, (page_access_token, profile_data.get('username'), page_name, webhook_subscribed, existing_id))
                     
                     # If user had free trial but lost replies (e.g., from database reset), restore them
                     cursor.execute(f"""
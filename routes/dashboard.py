@@ -11,6 +11,7 @@ from config import Config
 from database import get_db_connection, get_param_placeholder, is_postgres
 from extensions import csrf
 from services.auth import login_required
+from services import users_cache
 from services.users import get_user_by_id
 from services.messaging import get_conversation_list, get_messages_for_conversation, get_conversation_message_count
 from services.subscription import check_user_reply_limit, reset_monthly_replies_if_needed, increment_reply_count
@@ -567,6 +568,7 @@ def account_settings():
             """, (username, user['id']))
             
             conn.commit()
+            users_cache.invalidate(user['id'])
             
             flash("Username updated successfully!", "success")
             return redirect(url_for('dashboard_bp.account_settings'))
@@ -688,6 +690,7 @@ def delete_account():
         try:
             cursor.execute(f"DELETE FROM users WHERE id = {placeholder}", (user_id,))
             conn.commit()
+            users_cache.invalidate(user_id)
             logger.info(f"Successfully deleted user {user_id}")
         except Exception as e:
             logger.error(f"Could not delete user: {e}")
@@ -5,7 +5,7 @@ import stripe
 from flask import Blueprint, request, jsonify
 
 from config import Config
-from extensions import limiter
+from extensions import limiter, LIMIT_STRIPE_WEBHOOK, LIMIT_INSTAGRAM_WEBHOOK
 from database import get_db_connection, get_param_placeholder, is_postgres
 from services.instagram import _verify_instagram_webhook_signature
 from services.stripe_handlers import (
@@ -22,7 +22,7 @@ webhook_bp = Blueprint('webhook', __name__)
 
 # NOTE: @csrf.exempt must be applied to stripe_webhook during blueprint registration
 @webhook_bp.route("/webhook/stripe", methods=["POST"])
-@limiter.limit("200 per minute")
+@limiter.limit(LIMIT_STRIPE_WEBHOOK)
 def stripe_webhook():
     """Handle Stripe webhook events"""
     payload = request.data
@@ -115,7 +115,7 @@ def stripe_webhook():
 
 # NOTE: @csrf.exempt is applied to webhook_bp in app.py
 @webhook_bp.route("/webhook", methods=["GET", "POST"])
-@limiter.limit("150 per minute")
+@limiter.limit(LIMIT_INSTAGRAM_WEBHOOK)
 def webhook():
     if request.method == "GET":
         mode = request.args.get("hub.mode")
@@ -196,8 +196,8 @@ def webhook():
         # Instagram expects 200 within 20 seconds; the heavy work (DB, OpenAI, send)
         # happens in the RQ worker process with automatic retries.
         try:
-            job_id = enqueue_incoming_messages(incoming_by_sender)
-            logger.info(f"Webhook enqueued sender_batches={len(incoming_by_sender)} job_id={job_id}")
+            job_ids = enqueue_incoming_messages(incoming_by_sender)
+            logger.info(f"Webhook enqueued sender_batches={len(incoming_by_sender)} job_ids={job_ids}")
         except Exception as e:
             logger.error(f"Failed to enqueue webhook job, falling back to sync processing: {e}")
             try:
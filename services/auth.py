@@ -2,11 +2,18 @@
 import secrets
 from datetime import datetime, timedelta
 from functools import wraps
-from flask import session, flash, redirect, url_for
+from flask import current_app, session, flash, redirect, url_for
 from config import Config
 from database import get_db_connection, get_param_placeholder
 
 
+def rotate_session_id():
+    """Move a server-side session to a fresh id (no-op for cookie sessions) so a pre-login id can't be fixated."""
+    regenerate = getattr(current_app.session_interface, 'regenerate', None)
+    if regenerate is not None:
+        regenerate(session)
+
+
 def create_reset_token(user_id):
     """Create a password reset token"""
     token = secrets.token_urlsafe(32)
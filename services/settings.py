@@ -1,9 +1,16 @@
 """Global key-value settings (settings table). Used by AI and others without depending on app."""
+from config import Config
 from database import get_db_connection, get_param_placeholder
 
 
 def get_setting(key, default=None):
-    """Get a value from the settings table by key."""
+    """Get a setting by key.
+
+    Keys in Config.SETTINGS_DEFAULTS are served from memory unless
+    Config.SETTINGS_DB_OVERRIDES is set; everything else reads the settings table.
+    """
+    if not Config.SETTINGS_DB_OVERRIDES and key in Config.SETTINGS_DEFAULTS:
+        return Config.SETTINGS_DEFAULTS[key]
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
@@ -16,7 +23,10 @@ def get_setting(key, default=None):
 
 
 def set_setting(key, value):
-    """Update a value in the settings table."""
+    """Update a value in the settings table.
+
+    For keys in Config.SETTINGS_DEFAULTS this only takes effect with SETTINGS_DB_OVERRIDES enabled.
+    """
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
@@ -5,6 +5,7 @@ import sqlite3
 from werkzeug.security import generate_password_hash
 from database import get_db_connection, get_param_placeholder
 from config import Config
+from services import users_cache
 
 try:
     import psycopg2
@@ -44,6 +45,7 @@ def get_user_by_id(user_id):
             except Exception:
                 pass
 
+@users_cache.cached('email')
 def get_user_by_email(email):
     conn = None
     try:
@@ -52,15 +54,14 @@ def get_user_by_email(email):
             return None
         cursor = conn.cursor()
         placeholder = get_param_placeholder()
-        cursor.execute(f"SELECT id, username, email, password_hash, created_at FROM users WHERE email = {placeholder}", (email,))
+        cursor.execute(f"SELECT id, username, email, created_at FROM users WHERE email = {placeholder}", (email,))
         user = cursor.fetchone()
         if user:
             return {
                 'id': user[0],
                 'username': user[1],
                 'email': user[2],
-                'password_hash': user[3],
-                'created_at': user[4]
+                'created_at': user[3]
             }
         return None
     except Exception as e:
@@ -74,6 +75,7 @@ def get_user_by_email(email):
             except Exception:
                 pass
 
+@users_cache.cached('username_or_email')
 def get_user_by_username_or_email(username_or_email):
     """Get user by username or email - for login"""
     conn = None
@@ -85,15 +87,14 @@ def get_user_by_username_or_email(username_or_email):
         placeholder = get_param_placeholder()
         
         # Try username first, then email
-        cursor.execute(f"SELECT id, username, email, password_hash, created_at FROM users WHERE username = {placeholder} OR email = {placeholder}", (username_or_email, username_or_email))
+        cursor.execute(f"SELECT id, username, email, created_at FROM users WHERE username = {placeholder} OR email = {placeholder}", (username_or_email, username_or_email))
         user = cursor.fetchone()
         if user:
             return {
                 'id': user[0],
                 'username': user[1],
                 'email': user[2],
-                'password_hash': user[3],
-                'created_at': user[4]
+                'created_at': user[3]
             }
         return None
     except Exception as e:
@@ -106,6 +107,7 @@ def get_user_by_username_or_email(username_or_email):
             except Exception:
                 pass
 
+@users_cache.cached('username', normalize=str.lower)
 def get_user_by_username(username):
     """Get user by username only. Uses case-insensitive match so CHATADEMO and chatademo are treated as the same."""
     conn = None
@@ -116,7 +118,7 @@ def get_user_by_username(username):
         cursor = conn.cursor()
         placeholder = get_param_placeholder()
         cursor.execute(
-            f"SELECT id, username, email, password_hash, created_at FROM users WHERE LOWER(username) = LOWER({placeholder})",
+            f"SELECT id, username, email, created_at FROM users WHERE LOWER(username) = LOWER({placeholder})",
             (username,)
         )
         user = cursor.fetchone()
@@ -125,8 +127,7 @@ def get_user_by_username(username):
                 'id': user[0],
                 'username': user[1],
                 'email': user[2],
-                'password_hash': user[3],
-                'created_at': user[4]
+                'created_at': user[3]
             }
         return None
     except Exception as e:
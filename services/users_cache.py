@@ -0,0 +1,52 @@
+"""Users cache — short-lived in-process cache for the auth user lookups."""
+import functools
+import threading
+import time
+
+# Per-process: a write on one worker can only invalidate that worker's entries,
+# so the TTL bounds how long another worker may serve a stale row. The cached
+# lookups never return credentials (login re-reads password_hash by primary key),
+# so staleness is limited to id/username/email.
+_TTL_SECONDS = 30
+_MAX_ENTRIES = 10000
+
+_lock = threading.RLock()
+_entries = {}  # (lookup, key) -> (user dict, expires_at monotonic)
+
+
+def cached(lookup, normalize=None):
+    """Cache a single-argument user lookup's hits under (lookup, key).
+
+    Misses (None) are never cached, so a new signup is visible immediately.
+    Pass normalize (e.g. str.lower) when the query itself is case-insensitive.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(key):
+            cache_key = (lookup, normalize(key) if normalize else key)
+            now = time.monotonic()
+            with _lock:
+                entry = _entries.get(cache_key)
+                if entry is not None and now < entry[1]:
+                    return dict(entry[0])
+            user = func(key)
+            if user is not None:
+                with _lock:
+                    _entries.pop(cache_key, None)
+                    if len(_entries) >= _MAX_ENTRIES:
+                        # Insertion order == expiry order (one TTL): drop the oldest
+                        del _entries[next(iter(_entries))]
+                    _entries[cache_key] = (dict(user), now + _TTL_SECONDS)
+            return user
+        return wrapper
+    return decorator
+
+
+def invalidate(user_id=None):
+    """Drop every cached row for user_id, or everything when user_id is None."""
+    with _lock:
+        if user_id is None:
+            _entries.clear()
+            return
+        for cache_key in [k for k, (user, _) in _entries.items() if user['id'] == user_id]:
+            del _entries[cache_key]
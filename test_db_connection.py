@@ -13,7 +13,13 @@ load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 print("🔍 Testing Database Connection")
-print(f"🔍 DATABASE_URL: {DATABASE_URL[:50] if DATABASE_URL else 'None'}...")
+if DATABASE_URL:
+    # Never echo credentials: show only scheme, host and database name.
+    from urllib.parse import urlparse
+    _parsed = urlparse(DATABASE_URL)
+    print(f"🔍 DATABASE_URL: {_parsed.scheme}://***@{_parsed.hostname}/{_parsed.path.lstrip('/')}")
+else:
+    print("🔍 DATABASE_URL: None")
 
 if not DATABASE_URL:
     print("❌ No DATABASE_URL found in environment variables")
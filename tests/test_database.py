@@ -0,0 +1,39 @@
+"""Schema initialization against SQLite."""
+import os
+import sqlite3
+
+os.environ.pop("DATABASE_URL", None)
+
+import database  # noqa: E402
+from config import Config  # noqa: E402
+
+
+def test_init_database_upgrades_legacy_sqlite_users_table(tmp_path, monkeypatch):
+    db_file = str(tmp_path / "legacy.db")
+    monkeypatch.setattr(Config, "DB_FILE", db_file)
+    legacy = sqlite3.connect(db_file)
+    legacy.execute("""
+        CREATE TABLE users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    legacy.execute("INSERT INTO users (username, email, password_hash) VALUES ('old', 'old@example.com', 'h')")
+    legacy.commit()
+    legacy.close()
+
+    assert database.init_database() is True
+
+    conn = sqlite3.connect(db_file)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(users)")}
+    expected = {column for table, column, _ in database._SQLITE_ADDED_COLUMNS if table == 'users'}
+    assert expected <= columns
+    # Added without its CURRENT_TIMESTAMP default, so existing rows are backfilled
+    assert conn.execute("SELECT last_monthly_reset FROM users WHERE username = 'old'").fetchone()[0] is not None
+    conn.close()
+
+    # A second run is a no-op
+    assert database.init_database() is True
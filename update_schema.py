@@ -3,17 +3,19 @@
 Migration script to add missing columns to client_settings table
 Run this once to update your existing database schema
 """
-import os
+import logging
 from dotenv import load_dotenv
-from database import get_db_connection
+from database import get_db_connection, is_postgres as db_is_postgres
 
 load_dotenv()
 
+logger = logging.getLogger("chata.update_schema")
+
 def migrate_client_settings():
     """Add missing columns to client_settings table"""
     conn = get_db_connection()
     if not conn:
-        print("❌ Failed to connect to database")
+        logger.error("Failed to connect to database")
         return False
     
     cursor = conn.cursor()
@@ -59,8 +61,7 @@ def migrate_client_settings():
         ]
         
         # Check database type
-        db_url = os.environ.get('DATABASE_URL', '')
-        is_postgres = db_url.startswith('postgres://') or db_url.startswith('postgresql://')
+        is_postgres = db_is_postgres()
         
         for column_name, column_type in columns_to_add:
             try:
@@ -74,30 +75,30 @@ def migrate_client_settings():
                     
                     if not cursor.fetchone():
                         cursor.execute(f"ALTER TABLE client_settings ADD COLUMN {column_name} {column_type}")
-                        print(f"✅ Added column: {column_name}")
+                        logger.info(f"Added column: {column_name}")
                     else:
-                        print(f"⏭️  Column already exists: {column_name}")
+                        logger.debug(f"Column already exists: {column_name}")
                 else:
                     # SQLite: Try to add, ignore if exists
                     try:
                         cursor.execute(f"ALTER TABLE client_settings ADD COLUMN {column_name} {column_type}")
-                        print(f"✅ Added column: {column_name}")
+                        logger.info(f"Added column: {column_name}")
                     except Exception as e:
                         if "duplicate column" in str(e).lower() or "already exists" in str(e).lower():
-                            print(f"⏭️  Column already exists: {column_name}")
+                            logger.debug(f"Column already exists: {column_name}")
                         else:
                             raise
                             
             except Exception as e:
-                print(f"❌ Error adding column {column_name}: {e}")
+                logger.error(f"Error adding column {column_name}: {e}")
                 return False
         
         conn.commit()
-        print("✅ Migration completed successfully!")
+        logger.info("Migration completed successfully!")
         return True
         
     except Exception as e:
-        print(f"❌ Migration failed: {e}")
+        logger.error(f"Migration failed: {e}")
         conn.rollback()
         return False
     finally:
@@ -108,11 +109,10 @@ def migrate_client_settings_advanced_params():
     """Add temperature, presence_penalty, frequency_penalty to client_settings if missing."""
     conn = get_db_connection()
     if not conn:
-        print("❌ Failed to connect to database")
+        logger.error("Failed to connect to database")
         return False
     cursor = conn.cursor()
-    db_url = os.environ.get('DATABASE_URL', '')
-    is_postgres = db_url.startswith('postgres://') or db_url.startswith('postgresql://')
+    is_postgres = db_is_postgres()
     columns_to_add = [
         ('temperature', 'REAL DEFAULT 0.7'),
         ('presence_penalty', 'REAL DEFAULT 0'),
@@ -128,21 +128,21 @@ def migrate_client_settings_advanced_params():
                     """, (column_name,))
                     if not cursor.fetchone():
                         cursor.execute(f"ALTER TABLE client_settings ADD COLUMN {column_name} {column_type}")
-                        print(f"✅ Added column: {column_name}")
+                        logger.info(f"Added column: {column_name}")
                     else:
-                        print(f"⏭️  Column already exists: {column_name}")
+                        logger.debug(f"Column already exists: {column_name}")
                 else:
                     cursor.execute(f"ALTER TABLE client_settings ADD COLUMN {column_name} {column_type}")
-                    print(f"✅ Added column: {column_name}")
+                    logger.info(f"Added column: {column_name}")
             except Exception as e:
                 if "duplicate column" in str(e).lower() or "already exists" in str(e).lower():
-                    print(f"⏭️  Column already exists: {column_name}")
+                    logger.debug(f"Column already exists: {column_name}")
                 else:
                     raise
         conn.commit()
         return True
     except Exception as e:
-        print(f"❌ Migration failed: {e}")
+        logger.error(f"Migration failed: {e}")
         conn.rollback()
         return False
     finally:
@@ -153,14 +153,13 @@ def migrate_instagram_connections():
     """Add instagram_page_name and instagram_username to instagram_connections"""
     conn = get_db_connection()
     if not conn:
-        print("❌ Failed to connect to database")
+        logger.error("Failed to connect to database")
         return False
     
     cursor = conn.cursor()
     
     try:
-        db_url = os.environ.get('DATABASE_URL', '')
-        is_postgres = db_url.startswith('postgres://') or db_url.startswith('postgresql://')
+        is_postgres = db_is_postgres()
         
         for column_name, column_type in [('instagram_page_name', 'VARCHAR(255)' if is_postgres else 'TEXT'),
                                          ('instagram_username', 'VARCHAR(255)' if is_postgres else 'TEXT')]:
@@ -172,20 +171,20 @@ def migrate_instagram_connections():
                     """, (column_name,))
                     if not cursor.fetchone():
                         cursor.execute(f"ALTER TABLE instagram_connections ADD COLUMN {column_name} {column_type}")
-                        print(f"✅ Added column instagram_connections.{column_name}")
+                        logger.info(f"Added column instagram_connections.{column_name}")
                 else:
                     cursor.execute(f"ALTER TABLE instagram_connections ADD COLUMN {column_name} {column_type}")
-                    print(f"✅ Added column instagram_connections.{column_name}")
+                    logger.info(f"Added column instagram_connections.{column_name}")
             except Exception as e:
                 if "duplicate" in str(e).lower() or "already exists" in str(e).lower():
-                    print(f"⏭️  Column instagram_connections.{column_name} already exists")
+                    logger.debug(f"Column instagram_connections.{column_name} already exists")
                 else:
                     raise
         
         conn.commit()
         return True
     except Exception as e:
-        print(f"❌ instagram_connections migration failed: {e}")
+        logger.error(f"instagram_connections migration failed: {e}")
         conn.rollback()
         return False
     finally:
@@ -195,14 +194,13 @@ def migrate_messages_connection_id():
     """Add instagram_connection_id to messages table so messages can be scoped per Instagram connection"""
     conn = get_db_connection()
     if not conn:
-        print("❌ Failed to connect to database")
+        logger.error("Failed to connect to database")
         return False
     
     cursor = conn.cursor()
     
     try:
-        db_url = os.environ.get('DATABASE_URL', '')
-        is_postgres = db_url.startswith('postgres://') or db_url.startswith('postgresql://')
+        is_postgres = db_is_postgres()
         
         column_name = 'instagram_connection_id'
         if is_postgres:
@@ -217,9 +215,9 @@ def migrate_messages_connection_id():
                     ALTER TABLE messages 
                     ADD COLUMN instagram_connection_id INTEGER REFERENCES instagram_connections(id)
                 """)
-                print("✅ Added column messages.instagram_connection_id")
+                logger.info("Added column messages.instagram_connection_id")
             else:
-                print("⏭️  Column messages.instagram_connection_id already exists")
+                logger.debug("Column messages.instagram_connection_id already exists")
         else:
             # SQLite: try to add, ignore if it already exists
             try:
@@ -227,17 +225,17 @@ def migrate_messages_connection_id():
                     ALTER TABLE messages 
                     ADD COLUMN instagram_connection_id INTEGER REFERENCES instagram_connections(id)
                 """)
-                print("✅ Added column messages.instagram_connection_id")
+                logger.info("Added column messages.instagram_connection_id")
             except Exception as e:
                 if "duplicate" in str(e).lower() or "already exists" in str(e).lower():
-                    print("⏭️  Column messages.instagram_connection_id already exists")
+                    logger.debug("Column messages.instagram_connection_id already exists")
                 else:
                     raise
         
         conn.commit()
         return True
     except Exception as e:
-        print(f"❌ messages table migration failed: {e}")
+        logger.error(f"messages table migration failed: {e}")
         conn.rollback()
         return False
     finally:
@@ -247,12 +245,11 @@ def migrate_conversation_senders():
     """Create conversation_senders table for caching sender usernames (search by username)."""
     conn = get_db_connection()
     if not conn:
-        print("❌ Failed to connect to database")
+        logger.error("Failed to connect to database")
         return False
     cursor = conn.cursor()
     try:
-        db_url = os.environ.get('DATABASE_URL', '')
-        is_postgres = db_url.startswith('postgres://') or db_url.startswith('postgresql://')
+        is_postgres = db_is_postgres()
         if is_postgres:
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS conversation_senders (
@@ -272,10 +269,10 @@ def migrate_conversation_senders():
                 )
             """)
         conn.commit()
-        print("✅ conversation_senders table ready")
+        logger.info("conversation_senders table ready")
         return True
     except Exception as e:
-        print(f"❌ conversation_senders migration failed: {e}")
+        logger.error(f"conversation_senders migration failed: {e}")
         conn.rollback()
         return False
     finally:
@@ -285,12 +282,11 @@ def migrate_instagram_connections_webhook():
     """Add webhook status columns to instagram_connections (for Meta app review temporary UI)."""
     conn = get_db_connection()
     if not conn:
-        print("❌ Failed to connect to database")
+        logger.error("Failed to connect to database")
         return False
     cursor = conn.cursor()
     try:
-        db_url = os.environ.get('DATABASE_URL', '')
-        is_postgres = db_url.startswith('postgres://') or db_url.startswith('postgresql://')
+        is_postgres = db_is_postgres()
         columns_to_add = [
             ('webhook_subscription_active', 'BOOLEAN DEFAULT FALSE' if is_postgres else 'BOOLEAN DEFAULT 0'),
             ('last_webhook_at', 'TIMESTAMP'),
@@ -307,25 +303,25 @@ def migrate_instagram_connections_webhook():
                     """, (column_name,))
                     if not cursor.fetchone():
                         cursor.execute(f"ALTER TABLE instagram_connections ADD COLUMN {column_name} {column_type}")
-                        print(f"✅ Added column instagram_connections.{column_name}")
+                        logger.info(f"Added column instagram_connections.{column_name}")
                     else:
-                        print(f"⏭️  Column instagram_connections.{column_name} already exists")
+                        logger.debug(f"Column instagram_connections.{column_name} already exists")
                 else:
                     try:
                         cursor.execute(f"ALTER TABLE instagram_connections ADD COLUMN {column_name} {column_type}")
-                        print(f"✅ Added column instagram_connections.{column_name}")
+                        logger.info(f"Added column instagram_connections.{column_name}")
                     except Exception as e:
                         if "duplicate" in str(e).lower() or "already exists" in str(e).lower():
-                            print(f"⏭️  Column instagram_connections.{column_name} already exists")
+                            logger.debug(f"Column instagram_connections.{column_name} already exists")
                         else:
                             raise
             except Exception as e:
-                print(f"❌ Error adding instagram_connections.{column_name}: {e}")
+                logger.error(f"Error adding instagram_connections.{column_name}: {e}")
                 return False
         conn.commit()
         return True
     except Exception as e:
-        print(f"❌ instagram_connections webhook migration failed: {e}")
+        logger.error(f"instagram_connections webhook migration failed: {e}")
         conn.rollback()
         return False
     finally:
@@ -336,11 +332,10 @@ def migrate_client_settings_advanced_params():
     """Add advanced generation params to client_settings if missing."""
     conn = get_db_connection()
     if not conn:
-        print("❌ Failed to connect to database")
+        logger.error("Failed to connect to database")
         return False
     cursor = conn.cursor()
-    db_url = os.environ.get('DATABASE_URL', '')
-    is_postgres = db_url.startswith('postgres://') or db_url.startswith('postgresql://')
+    is_postgres = db_is_postgres()
     columns_to_add = [
         ('temperature', 'REAL DEFAULT 0.7'),
         ('presence_penalty', 'REAL DEFAULT 0'),
@@ -363,10 +358,10 @@ def migrate_client_settings_advanced_params():
                     continue
                 raise
         conn.commit()
-        print("✅ client_settings advanced params migration completed")
+        logger.info("client_settings advanced params migration completed")
         return True
     except Exception as e:
-        print(f"❌ client_settings advanced params migration failed: {e}")
+        logger.error(f"client_settings advanced params migration failed: {e}")
         conn.rollback()
         return False
     finally:
@@ -377,12 +372,11 @@ def migrate_queue_tables_and_indexes():
     """Create queue/dead-letter tables and critical indexes."""
     conn = get_db_connection()
     if not conn:
-        print("❌ Failed to connect to database")
+        logger.error("Failed to connect to database")
         return False
     cursor = conn.cursor()
     try:
-        db_url = os.environ.get('DATABASE_URL', '')
-        is_postgres = db_url.startswith('postgres://') or db_url.startswith('postgresql://')
+        is_postgres = db_is_postgres()
         cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_client_settings_user_connection ON client_settings(user_id, instagram_connection_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_conn_sender_id ON messages(instagram_connection_id, instagram_user_id, id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_conn_created_at ON messages(instagram_connection_id, created_at DESC)")
@@ -449,10 +443,10 @@ def migrate_queue_tables_and_indexes():
                 )
             """)
         conn.commit()
-        print("✅ queue tables and indexes migration completed")
+        logger.info("queue tables and indexes migration completed")
         return True
     except Exception as e:
-        print(f"❌ queue tables and indexes migration failed: {e}")
+        logger.error(f"queue tables and indexes migration failed: {e}")
         conn.rollback()
         return False
     finally:
@@ -460,7 +454,8 @@ def migrate_queue_tables_and_indexes():
 
 
 if __name__ == "__main__":
-    print("🔧 Running database migration to add missing columns...")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    logger.info("Running database migration to add missing columns...")
     ok1 = migrate_client_settings()
     ok2 = migrate_instagram_connections()
     ok3 = migrate_messages_connection_id()
@@ -469,6 +464,6 @@ if __name__ == "__main__":
     ok6 = migrate_instagram_connections_webhook()
     ok7 = migrate_queue_tables_and_indexes()
     if ok1 and ok2 and ok3 and ok4 and ok5 and ok6 and ok7:
-        print("✅ Your database is now updated and ready!")
+        logger.info("Your database is now updated and ready!")
     else:
-        print("❌ Migration failed. Please check the errors above.")
+        logger.error("Migration failed. Please check the errors above.")